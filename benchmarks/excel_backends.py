@@ -0,0 +1,112 @@
+"""Benchmark the Excel reader backends on synthetic workbooks.
+
+Reads the same rows with every installed backend and reports rows per
+second and peak RSS. Each backend runs in its own process so that its peak
+RSS can be measured. `.xls` workbooks are only included when xlwt is
+installed to write them.
+
+Run with: poetry run python benchmarks/excel_backends.py
+"""
+
+import datetime
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import openpyxl
+
+from tap_sharepointsites.file_handlers.excel_backends import BACKENDS
+from tap_sharepointsites.file_handlers.excel_handler import ExcelHandler
+
+ROWS = 50_000
+COLUMNS = 10
+
+try:
+    import xlwt
+except ImportError:
+    xlwt = None
+
+
+def make_row(row):
+    """Return a row of mixed strings, numbers and dates."""
+    values = []
+    for i in range(COLUMNS):
+        if i % 3 == 0:
+            values.append(f"value {row}-{i}")
+        elif i % 3 == 1:
+            values.append(row * i + 0.5)
+        else:
+            values.append(
+                datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=row)
+            )
+    return values
+
+
+def make_xlsx(path):
+    """Write a synthetic .xlsx workbook."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([f"Column {i}" for i in range(COLUMNS)])
+    for row in range(ROWS):
+        sheet.append(make_row(row))
+    workbook.save(path)
+
+
+def make_xls(path):
+    """Write a synthetic .xls workbook (at most 65535 rows)."""
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("Sheet1")
+    date_style = xlwt.easyxf(num_format_str="YYYY-MM-DD hh:mm:ss")
+    for i in range(COLUMNS):
+        sheet.write(0, i, f"Column {i}")
+    for row in range(min(ROWS, 65534)):
+        for i, value in enumerate(make_row(row)):
+            if isinstance(value, datetime.datetime):
+                sheet.write(row + 1, i, value, date_style)
+            else:
+                sheet.write(row + 1, i, value)
+    workbook.save(path)
+
+
+def measure(backend, path):
+    """Read a workbook with one backend and print rows/s and peak RSS."""
+    with open(path, "rb") as file:
+        content = file.read()
+
+    start = time.perf_counter()
+    handler = ExcelHandler(
+        content, "Sheet1", None, None, None, None, filename=path, backend=backend
+    )
+    rows = sum(1 for _ in handler.get_row_iterator())
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+    print(
+        f"  {backend:<9} {rows / elapsed:>10,.0f} rows/s"
+        f"  {elapsed:>6.1f} s  peak RSS {peak_mb:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        measure(sys.argv[1], sys.argv[2])
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workbooks = [(".xlsx", make_xlsx)]
+        if xlwt is not None:
+            workbooks.append((".xls", make_xls))
+
+        for extension, make in workbooks:
+            path = os.path.join(tmpdir, f"synthetic{extension}")
+            make(path)
+            print(f"{extension}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+            for name, backend in BACKENDS.items():
+                if extension in backend.extensions and backend.is_available():
+                    subprocess.run([sys.executable, __file__, name, path], check=True)
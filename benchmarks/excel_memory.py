@@ -0,0 +1,88 @@
+"""Benchmark peak memory of reading a large Excel workbook.
+
+Compares the old behaviour (write the bytes to a temp file and keep every
+cell object of the sheet in a list) against rows streamed lazily as value
+tuples by the ExcelHandler. Each variant runs in its own process so that
+its peak RSS can be measured.
+
+Run with: poetry run python benchmarks/excel_memory.py
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import openpyxl
+
+from tap_sharepointsites.file_handlers.excel_handler import ExcelHandler
+
+ROWS = 100_000
+COLUMNS = 10
+
+
+def make_workbook(path):
+    """Write a workbook of ROWS x COLUMNS string cells to `path`."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([f"Column {i}" for i in range(COLUMNS)])
+    for row in range(ROWS):
+        sheet.append([f"value {row}-{i}" for i in range(COLUMNS)])
+    workbook.save(path)
+
+
+def old_path(content):
+    """Load every cell object, then build a dict per row from them."""
+    with tempfile.NamedTemporaryFile(mode="wb", suffix=".xlsx") as temp:
+        temp.write(content)
+        temp.flush()
+        workbook = openpyxl.load_workbook(temp.name, read_only=True, data_only=True)
+        rows = list(workbook["Sheet1"].iter_rows())
+
+    header = [cell.value for cell in rows[0]]
+    count = 0
+    for row in rows[1:]:
+        record = {
+            header[index]: str(cell.value) if cell.value is not None else None
+            for index, cell in enumerate(row)
+        }
+        count += bool(record)
+    return count
+
+
+def new_path(content):
+    """Stream rows from the ExcelHandler."""
+    handler = ExcelHandler(content, "Sheet1", None, None, None, None)
+    return sum(1 for _ in handler.get_row_iterator())
+
+
+def measure(variant, path):
+    """Read the workbook with one variant and print rows, seconds and peak RSS."""
+    with open(path, "rb") as file:
+        content = file.read()
+
+    start = time.perf_counter()
+    rows = {"old": old_path, "new": new_path}[variant](content)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+    print(f"{variant}: {rows} rows in {elapsed:.1f} s, peak RSS {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        measure(sys.argv[1], sys.argv[2])
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "large.xlsx")
+        make_workbook(path)
+        print(
+            f"workbook: {ROWS} rows x {COLUMNS} columns, {os.path.getsize(path) / 1e6:.1f} MB"
+        )
+        for variant in ("old", "new"):
+            subprocess.run([sys.executable, __file__, variant, path], check=True)
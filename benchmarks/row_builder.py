@@ -0,0 +1,106 @@
+"""Micro-benchmark of building file stream records.
+
+Compares the old per-row work (csv.DictReader or a dict per Excel row,
+snakecase over every key, a timestamp per row) against the RowBuilder that
+is set up once per file. Rows are held in memory, so only the per-row
+overhead is measured, not parsing or downloading.
+
+Run with: poetry run python benchmarks/row_builder.py
+"""
+
+import csv
+import io
+import time
+from datetime import datetime, timezone
+
+from tap_sharepointsites.file_handlers.csv_handler import CSVHandler
+from tap_sharepointsites.row_builder import RowBuilder
+from tap_sharepointsites.utils import snakecase
+
+ROWS = 100_000
+COLUMNS = 20
+RECORD = {"name": "synthetic.csv", "lastModifiedDateTime": "2024-01-01T00:00:00Z"}
+HEADER = [f"Column Name {i}" for i in range(COLUMNS)]
+
+
+def make_csv():
+    """Return the lines of a synthetic CSV file."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for row in range(ROWS):
+        writer.writerow([f"value {row}-{i}" for i in range(COLUMNS)])
+    return buffer.getvalue().splitlines()
+
+
+def make_excel_rows():
+    """Return synthetic Excel rows as openpyxl-style value tuples."""
+    return [tuple(f"value {row}-{i}" for i in range(COLUMNS)) for row in range(ROWS)]
+
+
+def finish_row(row, i):
+    """Clean keys and add metadata to a row, as the stream used to."""
+    row = {snakecase(k): v for k, v in row.items()}
+    row.update(
+        {
+            "_sdc_source_file": RECORD["name"],
+            "_sdc_row_num": i,
+            "_sdc_loaded_at": str(datetime.now(timezone.utc)),
+            "lastModifiedDateTime": RECORD["lastModifiedDateTime"],
+        }
+    )
+    return row
+
+
+def old_csv(lines):
+    """Build records from a DictReader."""
+    reader = csv.DictReader(lines, restkey="_sdc_extra")
+    for i, row in enumerate(reader):
+        finish_row(row, i)
+
+
+def new_csv(lines):
+    """Build records from value rows with a RowBuilder."""
+    fieldnames, rows = CSVHandler(lines).get_value_rows()
+    for _ in RowBuilder(fieldnames, RECORD).build_all(rows):
+        pass
+
+
+def old_excel(rows):
+    """Build a dict per row, looking up header keys per cell."""
+    for i, row in enumerate(rows):
+        to_return = {}
+        for index, value in enumerate(row):
+            formatted_key = HEADER[index]
+            if not formatted_key:
+                formatted_key = "untitled_" + str(index)
+            to_return[formatted_key] = str(value) if value is not None else None
+        finish_row(to_return, i)
+
+
+def new_excel(rows):
+    """Convert values and build records with a RowBuilder."""
+    values = (tuple(None if v is None else str(v) for v in row) for row in rows)
+    for _ in RowBuilder(HEADER, RECORD).build_all(values):
+        pass
+
+
+def rate(function, data):
+    """Return rows per second of a function over the data."""
+    start = time.perf_counter()
+    function(data)
+    return ROWS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    lines, excel_rows = make_csv(), make_excel_rows()
+    print(f"{ROWS} rows x {COLUMNS} columns")
+    for name, old, new, data in (
+        ("csv", old_csv, new_csv, lines),
+        ("excel", old_excel, new_excel, excel_rows),
+    ):
+        before, after = rate(old, data), rate(new, data)
+        print(
+            f"{name:<6} before: {before:>9,.0f} rows/s  after: {after:>9,.0f} rows/s"
+            f"  ({after / before:.1f}x)"
+        )
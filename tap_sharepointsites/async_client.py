@@ -0,0 +1,153 @@
+"""Optional asyncio engine for fan-out Graph requests and downloads."""
+
+import asyncio
+import logging
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from tap_sharepointsites.session import get_timeout
+from tap_sharepointsites.throttling import Throttle
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 50
+
+
+class AsyncGraphClient:
+    """Keep many Graph requests in flight from a single thread.
+
+    Requests run on an httpx event loop with at most `max_concurrency` in
+    flight. Rate limiting and retries follow the same throttle as the
+    pooled requests session, so both engines share one budget.
+
+    The event loop and httpx client are created on first use and kept
+    until `close`, so connections are reused across calls.
+    """
+
+    def __init__(self, stream, max_concurrency=DEFAULT_MAX_CONCURRENCY, transport=None):
+        """Initialize the client with the config and auth of a stream.
+
+        Args:
+            stream: The stream whose authenticator and headers to use.
+            max_concurrency: Max number of requests in flight.
+            transport: Optional httpx transport, mostly useful in tests.
+        """
+        if httpx is None:
+            raise Exception(
+                "The async http engine needs httpx, install it with "
+                "`pip install tap-sharepointsites[async]`"
+            )
+        self.stream = stream
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+
+        adapter = stream.requests_session.get_adapter("https://")
+        self.throttle = getattr(adapter, "throttle", None) or Throttle()
+
+        connect, read = get_timeout(stream.config)
+        self.timeout = httpx.Timeout(read, connect=connect)
+
+        self._loop = None
+        self._http = None
+
+    async def _headers(self):
+        """Return request headers with a valid bearer token."""
+        headers = dict(self.stream.http_headers)
+        # a login blocks, so it runs off the event loop
+        token = await asyncio.to_thread(self.stream.authenticator.get_access_token)
+        headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def _client(self):
+        """Create the httpx client kept for the stream."""
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrency),
+            transport=self.transport,
+            follow_redirects=True,
+        )
+
+    async def _get(self, client, semaphore, url, params=None):
+        """GET a url, retrying throttled and transient failures."""
+        attempt = 0
+        while True:
+            wait = self.throttle.reserve()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self.throttle.reserve()
+
+            async with semaphore:
+                try:
+                    response = await client.get(
+                        url, params=params, headers=await self._headers()
+                    )
+                except httpx.TransportError:
+                    response = None
+                    delay = self.throttle.retry_delay(None, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    delay = self.throttle.retry_delay(response, attempt)
+                    if delay is None:
+                        response.raise_for_status()
+                        return response
+
+            LOGGER.warning(
+                "Retrying %s in %.1f seconds (attempt %d)",
+                url.split("?")[0],
+                delay,
+                attempt + 1,
+            )
+            await asyncio.sleep(self.throttle.record_retry(response, delay))
+            attempt += 1
+
+    def _run(self, coroutine):
+        """Run a coroutine on the kept event loop, creating it and the client if needed."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._http = self._client()
+        return self._loop.run_until_complete(coroutine)
+
+    async def _get_many(self, urls):
+        """GET many urls concurrently, returning responses in order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(
+            *(self._get(self._http, semaphore, url) for url in urls)
+        )
+
+    async def _get_page(self, url, params):
+        """GET one page of a Graph listing and return its JSON body."""
+        response = await self._get(self._http, asyncio.Semaphore(1), url, params)
+        return response.json()
+
+    def get_json_many(self, urls):
+        """Fetch many Graph urls and return their JSON bodies, in order."""
+        return [response.json() for response in self._run(self._get_many(urls))]
+
+    def download_many(self, urls):
+        """Download many files and return their bytes, in order."""
+        return [response.content for response in self._run(self._get_many(urls))]
+
+    def paginate(self, url, params=None):
+        """Yield every item of a paginated Graph listing, a page at a time.
+
+        The next page is only requested once the items of the previous one
+        have been consumed.
+        """
+        while url:
+            data = self._run(self._get_page(url, params))
+            yield from data["value"]
+            url, params = data.get("@odata.nextLink"), None
+
+    def close(self):
+        """Close the httpx client and its event loop, if they were created."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.run_until_complete(self._http.aclose())
+        finally:
+            self._loop.close()
+            self._loop = self._http = None
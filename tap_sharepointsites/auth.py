@@ -1,18 +1,89 @@
 """REST client handling, including sharepointsitesStream base class."""
 
 import logging
+import os
+import threading
+import time
 from datetime import datetime, timezone
 
 import typing as t
 from typing import Optional
 
 import requests
-from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
+from azure.core.pipeline.transport import RequestsTransport
+from azure.identity import (
+    AzureCliCredential,
+    DefaultAzureCredential,
+    EnvironmentCredential,
+    ManagedIdentityCredential,
+    WorkloadIdentityCredential,
+)
 from singer_sdk.authenticators import APIAuthenticatorBase, SingletonMeta
 from singer_sdk.streams.rest import _HTTPStream
 
+from tap_sharepointsites.token_cache import TokenCache
+
 logging.getLogger('azure.core.pipeline.policies.http_logging_policy').setLevel(logging.WARNING)
 
+AD_SCOPE = "https://graph.microsoft.com/.default"
+
+# refresh this long before a token expires, so in-flight requests still succeed
+DEFAULT_REFRESH_SKEW = 300
+
+# a failed background refresh is retried after this long, doubling up to the max
+BACKGROUND_RETRY_SECONDS = 30
+BACKGROUND_MAX_RETRY_SECONDS = 600
+
+CREDENTIAL_TYPES = (
+    "default",
+    "managed_identity",
+    "environment",
+    "workload_identity",
+    "azure_cli",
+)
+
+
+class CredentialCache:
+    """Azure credentials of a tap, keyed by type and client id.
+
+    Credentials are created once and reused for every refresh. Their token
+    requests go through the session the cache was created with.
+    """
+
+    def __init__(self, session):
+        """Initialize the cache.
+
+        Args:
+            session: Session without Graph auth to send token requests with.
+        """
+        self.session = session
+        self._lock = threading.Lock()
+        self._credentials = {}
+
+    def get(self, credential_type, client_id):
+        """Return the credential of a type and client id, creating it if needed."""
+        key = (credential_type, client_id)
+        with self._lock:
+            if key not in self._credentials:
+                self._credentials[key] = self.build(credential_type, client_id)
+            return self._credentials[key]
+
+    def build(self, credential_type, client_id):
+        """Create a credential of a type and client id."""
+        transport = RequestsTransport(session=self.session, session_owner=False)
+        if credential_type == "managed_identity":
+            return ManagedIdentityCredential(client_id=client_id, transport=transport)
+        elif credential_type == "environment":
+            return EnvironmentCredential(transport=transport)
+        elif credential_type == "workload_identity":
+            return WorkloadIdentityCredential(client_id=client_id, transport=transport)
+        elif credential_type == "azure_cli":
+            return AzureCliCredential()
+        elif credential_type == "default":
+            return DefaultAzureCredential(managed_identity_client_id=client_id, transport=transport)
+        raise Exception(f"Credential type {credential_type} not supported")
+
+
 class GraphAuthenticator(APIAuthenticatorBase, metaclass=SingletonMeta):
     """API Authenticator for OAuth 2.0 flows."""
 
@@ -31,10 +102,22 @@ class GraphAuthenticator(APIAuthenticatorBase, metaclass=SingletonMeta):
         """
         super().__init__(stream=stream)
 
+        # Token requests share the tap's connection pool, but never its auth
+        self._credentials: CredentialCache = stream._tap.credentials
+        self._token_cache = TokenCache.from_config(self.config or {})
+
         # Initialize internal tracking attributes
         self.access_token: Optional[str] = None
         self.last_refreshed: Optional[datetime] = None
-        self.expires_in: Optional[int] = None
+        self.expires_on: Optional[float] = None
+        self.refresh_skew = (self.config or {}).get(
+            "token_refresh_skew", DEFAULT_REFRESH_SKEW
+        )
+
+        # Refreshes are serialized, so concurrent workers log in only once
+        self._lock = threading.RLock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop_refresher = threading.Event()
 
     def authenticate_request(
         self,
@@ -48,12 +131,16 @@ class GraphAuthenticator(APIAuthenticatorBase, metaclass=SingletonMeta):
         Returns:
             The authenticated request object.
         """
-        if not self.is_token_valid():
-            self.update_access_token()
-
-        self.auth_headers["Authorization"] = f"Bearer {self.access_token}"
+        self.auth_headers["Authorization"] = f"Bearer {self.get_access_token()}"
         return super().authenticate_request(request)
 
+    def get_access_token(self) -> str:
+        """Return an access token, refreshing it first when it is about to expire."""
+        with self._lock:
+            if not self.is_token_valid():
+                self.update_access_token()
+            return self.access_token
+
 
     @property
     def client_id(self) -> Optional[str]:
@@ -64,54 +151,149 @@ class GraphAuthenticator(APIAuthenticatorBase, metaclass=SingletonMeta):
         """
         return self.config.get("client_id") if self.config else None
 
+    @property
+    def credential_type(self) -> str:
+        """Return the pinned credential type, managed identity with a client id."""
+        pinned = self.config.get("credential_type") if self.config else None
+        return pinned or ("managed_identity" if self.client_id else "default")
+
+    @property
+    def tenant_id(self) -> Optional[str]:
+        """Return the tenant the environment credentials log in to, if set."""
+        return os.environ.get("AZURE_TENANT_ID")
+
+    @property
+    def credential(self):
+        """Return the Azure credential shared by every refresh of the tap."""
+        return self._credentials.get(self.credential_type, self.client_id)
+
     def is_token_valid(self) -> bool:
         """Check if token is valid.
 
         Returns:
-            True if the token is valid (fresh).
+            True if the token does not expire within `refresh_skew` seconds.
         """
-        if self.last_refreshed is None:
+        if self.access_token is None:
             return False
-        if not self.expires_in:
+        if not self.expires_on:
             return True
-        return self.expires_in > (datetime.now(timezone.utc) - self.last_refreshed).total_seconds()
+        return time.time() < self.expires_on - self.refresh_skew
 
     # Authentication and refresh
-    def update_access_token(self) -> None:
-        """Update `access_token` along with: `last_refreshed` and `expires_in`.
+    def update_access_token(self, use_cache: bool = True) -> None:
+        """Update `access_token` along with: `last_refreshed` and `expires_on`.
+
+        Args:
+            use_cache: Reuse a cached token that is not about to expire.
 
         Raises:
             RuntimeError: When OAuth login fails.
         """
         request_time = datetime.now(timezone.utc)
-         
-        ad_scope = "https://graph.microsoft.com/.default"
-        
-        try:
-            if self.client_id:
-                creds = ManagedIdentityCredential(client_id=self.config["client_id"])
-                token = creds.get_token(ad_scope)
-            else:
-                creds = DefaultAzureCredential()
-                token = creds.get_token(ad_scope)
-                
-        except Exception as ex:
-            msg = f"Failed Azure Graph login. {ex}"
-            raise RuntimeError(msg) from ex
-
-        self.logger.info("Graph authorization attempt was successful.")
-
-        self.access_token = token.token
-        expiration = token.expires_on
-        self.expires_in = int(expiration) if expiration else None
-        if self.expires_in is None:
+
+        token = None
+        if use_cache:
+            token = self._token_cache.get(
+                AD_SCOPE,
+                self.client_id,
+                min_lifetime=self.refresh_skew,
+                credential_type=self.credential_type,
+                tenant_id=self.tenant_id,
+            )
+        if token is not None:
+            self.logger.debug("Reusing cached Graph access token.")
+        else:
+            try:
+                token = self.credential.get_token(AD_SCOPE)
+            except Exception as ex:
+                msg = f"Failed Azure Graph login. {ex}"
+                raise RuntimeError(msg) from ex
+
+            self.logger.info("Graph authorization attempt was successful.")
+            self._token_cache.put(
+                AD_SCOPE,
+                self.client_id,
+                token,
+                credential_type=self.credential_type,
+                tenant_id=self.tenant_id,
+            )
+
+        with self._lock:
+            self.access_token = token.token
+            self.expires_on = float(token.expires_on) if token.expires_on else None
+            self.last_refreshed = request_time
+        if self.expires_on is None:
             self.logger.debug(
-                "No expires_in received in get_token response and no "
-                "default_expiration set. Token will be treated as if it never "
-                "expires.",
+                "No expires_on received in get_token response. Token will be "
+                "treated as if it never expires.",
             )
-        self.last_refreshed = request_time
-        
+
+    def start_background_refresh(self) -> None:
+        """Renew the token in a daemon thread before it expires.
+
+        The token is renewed when `2 * refresh_skew` seconds are left, well
+        before requests would refresh it themselves, so workers never wait
+        for a login. See `background_refresh_delay` for tokens issued with
+        less lifetime than that.
+        """
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop_refresher.clear()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="graph-token-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def stop_background_refresh(self) -> None:
+        """Stop the background refresher, if running."""
+        self._stop_refresher.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def background_refresh_delay(self) -> Optional[float]:
+        """Return the seconds until the background refresh, or None if never needed.
+
+        The refresh is due `2 * refresh_skew` seconds before the current
+        token expires. A token issued with less lifetime than that is
+        renewed halfway to the time requests would refresh it themselves,
+        and at most every `BACKGROUND_RETRY_SECONDS`.
+        """
+        if self.access_token is None:
+            return 0.0
+        if not self.expires_on:
+            return None
+
+        now = time.time()
+        wait = self.expires_on - 2 * self.refresh_skew - now
+        if wait <= 0:
+            wait = max((self.expires_on - self.refresh_skew - now) / 2, BACKGROUND_RETRY_SECONDS)
+        return wait
+
+    def _refresh_loop(self) -> None:
+        """Renew the token until `stop_background_refresh` is called."""
+        failures = 0
+        while not self._stop_refresher.is_set():
+            if failures:
+                # back off exponentially while logins keep failing
+                wait = min(
+                    BACKGROUND_RETRY_SECONDS * 2 ** (failures - 1), BACKGROUND_MAX_RETRY_SECONDS
+                )
+            else:
+                wait = self.background_refresh_delay()
+                if wait is None:
+                    return
+            if wait > 0 and self._stop_refresher.wait(wait):
+                return
+
+            try:
+                self.update_access_token(use_cache=False)
+                failures = 0
+            except RuntimeError as ex:
+                failures += 1
+                self.logger.warning(f"Background token refresh failed: {ex}")
+
     @classmethod
     def create_for_stream(
         cls: t.Type["GraphAuthenticator"],
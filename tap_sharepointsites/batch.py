@@ -0,0 +1,127 @@
+"""Send independent Graph GET requests through the JSON `$batch` endpoint."""
+
+import logging
+from urllib.parse import urlsplit
+
+from requests.structures import CaseInsensitiveDict
+
+from tap_sharepointsites.throttling import Throttle
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 20
+
+
+def split_graph_url(url):
+    """Split an absolute Graph url into its version root and relative url."""
+    parts = urlsplit(url)
+    version, _, path = parts.path.lstrip("/").partition("/")
+    root = f"{parts.scheme}://{parts.netloc}/{version}"
+    relative = f"/{path}?{parts.query}" if parts.query else f"/{path}"
+    return root, relative
+
+
+class BatchItemResponse:
+    """Response of a single sub-request of a batch."""
+
+    def __init__(self, url, status_code, headers, body):
+        """Initialize the response."""
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.body = body
+
+    @property
+    def ok(self):
+        """Return True for a 2xx status."""
+        return 200 <= self.status_code < 300
+
+
+class GraphBatchClient:
+    """Group GET requests into `$batch` calls of up to 20 sub-requests.
+
+    Sub-requests that are throttled or fail transiently are sent again in a
+    later batch, following the retry policy of the tap's throttle.
+    """
+
+    def __init__(self, stream):
+        """Initialize the client with the session and auth of a stream."""
+        self.session = stream.requests_session
+        self.auth = stream.authenticator
+        self.headers = stream.http_headers
+        adapter = self.session.get_adapter("https://")
+        self.throttle = getattr(adapter, "throttle", None) or Throttle()
+
+    def _send(self, root, items):
+        """Send one batch of (index, relative url) pairs."""
+        payload = {
+            "requests": [
+                {"id": str(index), "method": "GET", "url": relative}
+                for index, relative in items
+            ]
+        }
+        response = self.session.post(
+            f"{root}/$batch", json=payload, headers=self.headers, auth=self.auth
+        )
+        response.raise_for_status()
+
+        return {
+            int(item["id"]): (item["status"], item.get("headers"), item.get("body"))
+            for item in response.json()["responses"]
+        }
+
+    def get(self, urls):
+        """Fetch absolute urls, returning a BatchItemResponse per url, in order."""
+        results = [None] * len(urls)
+        pending = list(range(len(urls)))
+        attempt = 0
+
+        while pending:
+            by_root = {}
+            for index in pending:
+                root, relative = split_graph_url(urls[index])
+                by_root.setdefault(root, []).append((index, relative))
+
+            retry, delay, retry_response = [], None, None
+            for root, items in by_root.items():
+                for start in range(0, len(items), MAX_BATCH_SIZE):
+                    end = start + MAX_BATCH_SIZE
+                    sent = self._send(root, items[start:end])
+                    for index, (status, headers, body) in sent.items():
+                        item = BatchItemResponse(urls[index], status, headers, body)
+                        results[index] = item
+                        item_delay = (
+                            None
+                            if item.ok
+                            else self.throttle.retry_delay(item, attempt)
+                        )
+                        if item_delay is not None:
+                            retry.append(index)
+                            if delay is None or item_delay > delay:
+                                delay, retry_response = item_delay, item
+
+            if retry:
+                LOGGER.warning(
+                    "Retrying %d batched requests in %.1f seconds", len(retry), delay
+                )
+                self.throttle.wait(retry_response, delay)
+                attempt += 1
+            pending = retry
+
+        return results
+
+    def get_json(self, urls):
+        """Fetch absolute urls and return their JSON bodies, in order.
+
+        Raises one exception reporting every failed url.
+        """
+        items = self.get(urls)
+        failed = [item for item in items if not item.ok]
+        if failed:
+            raise Exception(
+                "; ".join(
+                    f"Error getting {item.url}: {item.status_code}: {item.body}"
+                    for item in failed
+                )
+            )
+        return [item.body for item in items]
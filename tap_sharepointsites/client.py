@@ -11,7 +11,9 @@ from singer_sdk.helpers.jsonpath import extract_jsonpath
 from singer_sdk.pagination import BaseHATEOASPaginator
 from singer_sdk.streams.rest import RESTStream
 
+from tap_sharepointsites.async_client import DEFAULT_MAX_CONCURRENCY, AsyncGraphClient
 from tap_sharepointsites.auth import GraphAuthenticator
+from tap_sharepointsites.session import get_timeout
 
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
 
@@ -26,6 +28,57 @@ class GraphHATEOASPaginator(BaseHATEOASPaginator):
         """Return the URL for next page."""
         return response.json().get("@odata.nextLink")
 
+    def continue_if_empty(self, response):
+        """Keep paging past empty pages while Graph returns a next link."""
+        return self.get_next_url(response) is not None
+
+
+class PageSizer:
+    """Choose the `$top` page size, optionally adapting it to the server.
+
+    In adaptive mode the page size doubles while responses come back well
+    under `target_seconds`, and halves when they are slow or throttled.
+    """
+
+    def __init__(
+        self,
+        page_size=None,
+        adaptive=False,
+        min_size=50,
+        max_size=5000,
+        target_seconds=5.0,
+    ):
+        """Initialize the page sizer."""
+        self.adaptive = adaptive
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        if adaptive and not page_size:
+            page_size = 200
+        self.page_size = page_size
+
+    def apply(self, params):
+        """Set `$top` on a dict of url params."""
+        if self.page_size:
+            params["$top"] = self.page_size
+        return params
+
+    def observe(self, response):
+        """Adjust the page size after a response.
+
+        The pooled adapter retries throttled requests itself, so the
+        statuses of its retried attempts are checked as well.
+        """
+        if not self.adaptive:
+            return
+
+        statuses = [response.status_code, *getattr(response, "retried_statuses", ())]
+        elapsed = response.elapsed.total_seconds()
+        if any(status in (429, 503) for status in statuses) or elapsed > self.target_seconds:
+            self.page_size = max(self.min_size, self.page_size // 2)
+        elif response.ok and elapsed < self.target_seconds / 2:
+            self.page_size = min(self.max_size, self.page_size * 2)
+
 
 class sharepointsitesStream(RESTStream):
     """sharepointsites stream class."""
@@ -33,6 +86,8 @@ class sharepointsitesStream(RESTStream):
     def __init__(self, **kwargs):
         """Initialize stream class."""
         self._authenticator: Optional[GraphAuthenticator] = None
+        self._page_sizer: Optional[PageSizer] = None
+        self._async_client: Optional[AsyncGraphClient] = None
         super().__init__(**kwargs)
 
     @property
@@ -43,6 +98,56 @@ class sharepointsitesStream(RESTStream):
             
         return self._authenticator
 
+    @property
+    def requests_session(self) -> requests.Session:
+        """Return the pooled session shared by all streams of the tap."""
+        return self._tap.http_session
+
+    @property
+    def async_client(self) -> Optional[AsyncGraphClient]:
+        """Return the asyncio engine when `http_engine` is "async", else None."""
+        if self.config.get("http_engine", "requests") != "async":
+            return None
+        if self._async_client is None:
+            self._async_client = AsyncGraphClient(
+                self,
+                self.config.get("async_max_concurrency", DEFAULT_MAX_CONCURRENCY),
+            )
+        return self._async_client
+
+    def close_async_client(self) -> None:
+        """Close the asyncio engine and its connections, if it was started."""
+        if self._async_client is not None:
+            self._async_client.close()
+
+    @property
+    def timeout(self):
+        """Return the (connect, read) timeout for requests."""
+        return get_timeout(self.config)
+
+    @property
+    def page_size(self) -> Optional[int]:
+        """Return the configured `$top` page size."""
+        return self.config.get("page_size")
+
+    @property
+    def page_sizer(self) -> PageSizer:
+        """Return the page sizer for this stream."""
+        if self._page_sizer is None:
+            self._page_sizer = PageSizer(
+                self.page_size, adaptive=self.config.get("adaptive_page_size", False)
+            )
+        return self._page_sizer
+
+    def validate_response(self, response: requests.Response) -> None:
+        """Feed response timings to the page sizer, then validate."""
+        self.page_sizer.observe(response)
+        super().validate_response(response)
+
+    def backoff_max_tries(self) -> int:
+        """Do not retry on top of the pooled session, which already retries."""
+        return 1
+
     @property
     def http_headers(self) -> dict:
         """Return the http headers needed."""
@@ -60,10 +165,11 @@ class sharepointsitesStream(RESTStream):
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
-        """Return next page link or None."""
+        """Return next page link params, with the current page size."""
+        params = {}
         if next_page_token:
-            return dict(parse_qsl(next_page_token.query))
-        return {}
+            params = dict(parse_qsl(next_page_token.query))
+        return self.page_sizer.apply(params)
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result records."""
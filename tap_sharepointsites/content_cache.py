@@ -0,0 +1,196 @@
+"""On-disk cache of downloaded file contents, kept between runs."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def content_hash(record):
+    """Return the identity of a drive item's bytes: its quickXorHash, or else its cTag."""
+    hashes = (record.get("file") or {}).get("hashes") or {}
+    return hashes.get("quickXorHash") or record.get("cTag")
+
+
+class ContentCache:
+    """Keep downloaded files in a directory between runs.
+
+    Files are keyed by their `quickXorHash`, so a file whose metadata
+    changed but whose bytes did not is not downloaded again. Items without
+    a hash are keyed by id and `cTag`. An index file holds the size,
+    charset and last use of every entry, and the least recently used
+    entries are removed once the cache holds more than `max_bytes`.
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        """Initialize the cache.
+
+        Args:
+            path: Directory holding the cached files.
+            max_bytes: Max total size of the cached files.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._entries = self._load()
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a content cache from the tap config, or None if disabled."""
+        if not config.get("content_cache_path"):
+            return None
+        return cls(
+            config["content_cache_path"],
+            config.get("content_cache_max_bytes", DEFAULT_MAX_BYTES),
+        )
+
+    @staticmethod
+    def cache_key(record):
+        """Return the cache key of a drive item, or None if it has no content identity."""
+        hashes = (record.get("file") or {}).get("hashes") or {}
+        if hashes.get("quickXorHash"):
+            key = f"quickXorHash:{hashes['quickXorHash']}"
+        elif record.get("id") and record.get("cTag"):
+            key = f"cTag:{record['id']}:{record['cTag']}"
+        else:
+            return None
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @property
+    def total_bytes(self):
+        """Return the total size of the cached files."""
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def _load(self):
+        """Read the index, ignoring a missing or unreadable one."""
+        try:
+            with open(
+                os.path.join(self.path, self.INDEX), "r", encoding="utf-8"
+            ) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as ex:
+            LOGGER.warning(
+                f"Ignoring unreadable content cache index in {self.path}: {ex}"
+            )
+            return {}
+
+    def _save(self):
+        """Write the index atomically."""
+        index_path = os.path.join(self.path, self.INDEX)
+        with open(f"{index_path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(self._entries, file)
+        os.replace(f"{index_path}.tmp", index_path)
+
+    def get(self, record):
+        """Return the cached (content, charset) of a drive item, or None."""
+        key = self.cache_key(record)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                return None
+            try:
+                with open(os.path.join(self.path, key), "rb") as file:
+                    content = file.read()
+            except FileNotFoundError:
+                del self._entries[key]
+                return None
+            entry["used_at"] = time.time()
+            return content, entry["charset"]
+
+    def open_file(self, record):
+        """Return an open binary file of the cached content of a drive item and its charset, or None."""
+        key = self.cache_key(record)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                return None
+            try:
+                file = open(os.path.join(self.path, key), "rb")
+            except FileNotFoundError:
+                del self._entries[key]
+                return None
+            entry["used_at"] = time.time()
+            return file, entry["charset"]
+
+    def put(self, record, content, charset=None):
+        """Store the content of a drive item, evicting old entries over the size limit."""
+        key = self.cache_key(record)
+        if key is None or len(content) > self.max_bytes:
+            return
+
+        with self._lock:
+            try:
+                tmp_path = os.path.join(self.path, f"{key}.tmp")
+                with open(tmp_path, "wb") as file:
+                    file.write(content)
+                os.replace(tmp_path, os.path.join(self.path, key))
+                self._entries[key] = {
+                    "size": len(content),
+                    "charset": charset,
+                    "used_at": time.time(),
+                }
+                self._evict()
+                self._save()
+            except OSError as ex:
+                LOGGER.warning(f"Could not write content cache {self.path}: {ex}")
+
+    def put_file(self, record, path, charset=None):
+        """Store a downloaded file, as a hard link when possible, like `put`."""
+        key = self.cache_key(record)
+        if key is None:
+            return
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            try:
+                tmp_path = os.path.join(self.path, f"{key}.tmp")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                try:
+                    os.link(path, tmp_path)
+                except OSError:
+                    shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, os.path.join(self.path, key))
+                self._entries[key] = {
+                    "size": size,
+                    "charset": charset,
+                    "used_at": time.time(),
+                }
+                self._evict()
+                self._save()
+            except OSError as ex:
+                LOGGER.warning(f"Could not write content cache {self.path}: {ex}")
+
+    def _evict(self):
+        """Remove the least recently used files until the cache fits its size limit."""
+        total = self.total_bytes
+        for key in sorted(self._entries, key=lambda key: self._entries[key]["used_at"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries.pop(key)["size"]
+            try:
+                os.remove(os.path.join(self.path, key))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Persist the last use of entries read during the run."""
+        with self._lock:
+            try:
+                self._save()
+            except OSError as ex:
+                LOGGER.warning(f"Could not write content cache {self.path}: {ex}")
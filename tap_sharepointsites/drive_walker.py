@@ -0,0 +1,242 @@
+"""Walk the files of a drive folder, by listing it or through the delta query."""
+
+import logging
+from collections import deque
+from datetime import timezone
+
+LOGGER = logging.getLogger(__name__)
+
+# key set on drive items to the file path relative to the configured folder
+RELATIVE_PATH = "relativePath"
+
+# drive item fields the file and text streams use
+SELECT_FIELDS = ",".join(
+    [
+        "id",
+        "name",
+        "file",
+        "folder",
+        "root",
+        "deleted",
+        "parentReference",
+        "lastModifiedDateTime",
+        "size",
+        "cTag",
+        "eTag",
+        "@microsoft.graph.downloadUrl",
+    ]
+)
+
+# characters with a special meaning in a regex
+REGEX_SPECIAL = set(".^$*+?{}[]|()\\")
+
+
+def literal_prefix(pattern):
+    """Return the literal text every name matching a regex starts with."""
+    if "|" in pattern:
+        return ""
+    pattern = pattern[1:] if pattern.startswith("^") else pattern
+
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char = pattern[i + 1]
+            i += 2
+        elif char in REGEX_SPECIAL:
+            break
+        else:
+            i += 1
+
+        if i < len(pattern) and pattern[i] in "*?{":
+            # the character is optional or repeated
+            break
+        prefix.append(char)
+        if i < len(pattern) and pattern[i] == "+":
+            break
+    return "".join(prefix)
+
+
+def listing_params(file_pattern, since=None, server_filter=False):
+    """Return the url params of a folder listing.
+
+    Only the fields the streams use are selected. With `server_filter`,
+    the listing is also filtered on the literal prefix of `file_pattern`
+    and on files modified after `since`, which not every drive supports.
+    """
+    params = {"$select": SELECT_FIELDS}
+    if not server_filter:
+        return params
+
+    filters = []
+    prefix = literal_prefix(file_pattern)
+    if prefix:
+        escaped = prefix.replace("'", "''")
+        filters.append(f"startswith(name,'{escaped}')")
+    if since:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        since = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        filters.append(f"lastModifiedDateTime gt {since}")
+        params["$orderby"] = "lastModifiedDateTime"
+    if filters:
+        params["$filter"] = " and ".join(filters)
+    return params
+
+
+def source_name(record):
+    """Return the name a file is recorded under: its relative path if known."""
+    return record.get(RELATIVE_PATH, record["name"])
+
+
+def list_folder(
+    stream, drive_id, folder=None, headers=None, recursive=False, params=None
+):
+    """Yield the files of a folder, and of its subfolders when recursive.
+
+    Folders are listed breadth first and lazily, so a caller that stops
+    early only lists as much as it needed.
+    """
+    if not folder:
+        url = f"{stream.url_base}/drives/{drive_id}/root/children"
+    else:
+        url = f"{stream.url_base}/drives/{drive_id}/root:/{folder}:/children"
+
+    folders = deque([(url, "")])
+    while folders:
+        url, prefix = folders.popleft()
+        for item in list_children(stream, url, headers, params):
+            if "folder" in item and recursive:
+                folders.append(
+                    (
+                        f"{stream.url_base}/drives/{drive_id}/items/{item['id']}/children",
+                        f"{prefix}{item['name']}/",
+                    )
+                )
+            elif "file" in item:
+                if recursive:
+                    item[RELATIVE_PATH] = prefix + item["name"]
+                yield item
+
+
+def list_children(stream, url, headers=None, params=None):
+    """Yield every item of a children listing, following next links."""
+    # next links already carry the params of the first request
+    params = stream.page_sizer.apply(dict(params or {}))
+    if stream.async_client:
+        yield from stream.async_client.paginate(url, params)
+        return
+
+    while url:
+        response = stream.requests_session.get(
+            url, headers=headers, auth=stream.authenticator, params=params
+        )
+        stream.page_sizer.observe(response)
+        response.raise_for_status()
+        data = response.json()
+        yield from data["value"]
+
+        url = data.get("@odata.nextLink")
+        params = None
+
+
+class DriveWalker:
+    """Find the files of a folder among the items of a drive delta feed.
+
+    SharePoint only supports the delta query on the drive root, and its
+    items carry no `parentReference.path`. The walker keeps the name and
+    parent of every folder it has seen in `folders`, which is kept in the
+    stream state, so file paths can be rebuilt from parent ids on later
+    runs, which only return changed items.
+    """
+
+    def __init__(self, folders, folder=None, recursive=False):
+        """Initialize the walker.
+
+        Args:
+            folders: Map of folder id to [name, parent id], updated in place.
+            folder: Folder whose files are wanted, relative to the drive root.
+            recursive: Whether to include the files of subfolders.
+        """
+        self.folders = folders
+        self.folder = (folder or "").strip("/").casefold()
+        self.recursive = recursive
+        # files seen before their parent folder, resolved at the end of the feed
+        self.pending = []
+
+    def folder_path(self, item_id):
+        """Return the path of a folder from the drive root, or None if unknown."""
+        names = []
+        while True:
+            # the length check guards against cycles in a corrupt state
+            if item_id not in self.folders or len(names) > len(self.folders):
+                return None
+            name, item_id = self.folders[item_id]
+            if item_id is None:
+                return "/".join(reversed(names))
+            names.append(name)
+
+    def relative_path(self, parent_path, name):
+        """Return the path of a file relative to the folder, or None if outside it."""
+        if self.folder:
+            parent = parent_path.casefold()
+            prefix = self.folder + "/"
+            if parent == self.folder:
+                parent_path = ""
+            elif parent.startswith(prefix):
+                start = len(prefix)
+                parent_path = parent_path[start:]
+            else:
+                return None
+
+        if parent_path and not self.recursive:
+            return None
+        return f"{parent_path}/{name}" if parent_path else name
+
+    def update_folders(self, items):
+        """Record the folders of a page of items."""
+        for item in items:
+            if "root" in item:
+                self.folders[item["id"]] = ["", None]
+            elif "deleted" in item:
+                self.folders.pop(item["id"], None)
+            elif "folder" in item:
+                parent_id = item.get("parentReference", {}).get("id")
+                self.folders[item["id"]] = [item["name"], parent_id]
+
+    def resolve(self, item):
+        """Set the relative path of a file.
+
+        Returns False if the file is outside the folder, and None if its
+        parent folder has not been seen yet.
+        """
+        parent_path = self.folder_path(item.get("parentReference", {}).get("id"))
+        if parent_path is None:
+            return None
+        relative = self.relative_path(parent_path, item["name"])
+        if relative is None:
+            return False
+        item[RELATIVE_PATH] = relative
+        return True
+
+    def changed_files(self, items, last_page=False):
+        """Yield the changed files of the folder from a page of delta items."""
+        self.update_folders(items)
+        for item in items:
+            if "file" not in item or "deleted" in item:
+                continue
+            resolved = self.resolve(item)
+            if resolved is None:
+                self.pending.append(item)
+            elif resolved:
+                yield item
+
+        if last_page:
+            pending, self.pending = self.pending, []
+            for item in pending:
+                resolved = self.resolve(item)
+                if resolved is None:
+                    LOGGER.warning(f"Skipping {item['name']}, its folder is unknown")
+                elif resolved:
+                    yield item
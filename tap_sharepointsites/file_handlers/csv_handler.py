@@ -1,26 +1,122 @@
 """Handle CSV files."""
 
+import codecs
 import csv
 import logging
+from email.message import Message
+from itertools import chain
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:  # pragma: no cover
+    from_bytes = None
 
 LOGGER = logging.getLogger(__name__)
 
+# bytes looked at to choose the encoding of a file
+DETECT_BYTES = 64 * 1024
+
+# UTF-32 goes first, as its little endian BOM starts with the UTF-16 one
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def get_charset(content_type):
+    """Return the charset declared in a Content-Type header, or None."""
+    if not content_type:
+        return None
+    message = Message()
+    message["content-type"] = content_type
+    return message.get_param("charset")
+
+
+def sniff_encoding(prefix, encoding=None, charset=None):
+    """Choose the encoding of a file from the first bytes of it.
+
+    A byte order mark wins, then the configured `encoding`, then the
+    `charset` of the response. Otherwise the prefix is checked to be UTF-8,
+    and detection runs on the prefix only as a last resort.
+    """
+    for bom, bom_encoding in BOMS:
+        if prefix.startswith(bom):
+            return bom_encoding
+    if encoding or charset:
+        return encoding or charset
+
+    try:
+        # the prefix may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(prefix)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    match = from_bytes(prefix).best() if from_bytes else None
+    detected = match.encoding if match else "cp1252"
+    LOGGER.info(f"Detected encoding {detected}")
+    return detected
+
+
+def iter_text_lines(chunks, encoding=None, charset=None):
+    """Yield the decoded lines of byte chunks, sniffing the encoding first."""
+    chunks = iter(chunks)
+    prefix = b""
+    for chunk in chunks:
+        prefix += chunk
+        if len(prefix) >= DETECT_BYTES:
+            break
+
+    yield from iter_decoded_lines(
+        chain([prefix], chunks), sniff_encoding(prefix[:DETECT_BYTES], encoding, charset)
+    )
+
+
+def iter_decoded_lines(chunks, encoding="utf-8"):
+    """Decode byte chunks incrementally and yield lines with their line endings."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        # the last line may continue in the next chunk, even if it ends with \r
+        pending = lines.pop() if lines else ""
+        yield from lines
+
+    pending += decoder.decode(b"", final=True)
+    yield from pending.splitlines(keepends=True)
+
 
 class CSVHandler:
     """Handle CSV files."""
 
     def __init__(self, textcontent, delimiter=","):
-        """Initialize ExcelHandler."""
+        """Initialize CSVHandler with the file text or an iterable of its lines."""
         self.textcontent = textcontent
         self.delimiter = delimiter
 
+    def _lines(self):
+        """Return the lines of the file."""
+        if isinstance(self.textcontent, str):
+            return self.textcontent.splitlines()
+        return self.textcontent
+
     def get_dictreader(self):
         """Read CSV file and return csv DictReader object for the file."""
         dr = csv.DictReader(
-            self.textcontent.splitlines(),
+            self._lines(),
             fieldnames=None,
             restkey="_sdc_extra",
             delimiter=self.delimiter,
         )
 
         return dr
+
+    def get_value_rows(self):
+        """Read CSV file and return its fieldnames and an iterator of row lists."""
+        reader = csv.reader(self._lines(), delimiter=self.delimiter)
+        rows = (row for row in reader if row)
+        return next(rows, []), rows
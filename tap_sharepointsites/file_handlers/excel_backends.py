@@ -0,0 +1,212 @@
+"""Reader backends for Excel workbooks."""
+
+import io
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from itertools import islice
+
+import openpyxl
+import xlrd
+
+try:
+    import python_calamine
+except ImportError:  # pragma: no cover
+    python_calamine = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+def slice_rows(rows, min_row, max_row, min_col, max_col):
+    """Limit an iterator of row tuples to 1-based, inclusive row and column bounds."""
+    start = (min_row or 1) - 1
+    stop = max_row if max_row else None
+    first_col = (min_col or 1) - 1
+    for row in islice(rows, start, stop):
+        yield tuple(row[first_col:max_col])
+
+
+def normalize_number(value):
+    """Return whole floats as ints, like openpyxl does for integer cells."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def normalize_value(value):
+    """Return a calamine cell value as openpyxl would read it."""
+    if value == "":
+        return None
+    # openpyxl reads every date cell as a datetime
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return normalize_number(value)
+
+
+class ExcelBackend(ABC):
+    """Read the rows of a workbook sheet as tuples of cell values.
+
+    Empty cells are None and whole numbers are ints in every backend, so
+    records do not depend on which backend read the file.
+    """
+
+    name = None
+    extensions = ()
+
+    @abstractmethod
+    def __init__(self, content):
+        """Open a workbook from bytes or a seekable buffer."""
+
+    @classmethod
+    def is_available(cls):
+        """Return True when the reader library is installed."""
+        return True
+
+    @abstractmethod
+    def iter_rows(
+        self, sheet_name, min_row=None, max_row=None, min_col=None, max_col=None
+    ):
+        """Yield the rows of a sheet as tuples of values."""
+
+    def close(self):
+        """Release the workbook."""
+
+
+class OpenpyxlBackend(ExcelBackend):
+    """Read .xlsx and .xlsm files with openpyxl in read-only mode."""
+
+    name = "openpyxl"
+    extensions = (".xlsx", ".xlsm")
+
+    def __init__(self, content):
+        """Open a read-only workbook."""
+        if isinstance(content, (bytes, bytearray)):
+            content = io.BytesIO(content)
+        self.workbook = openpyxl.load_workbook(content, read_only=True, data_only=True)
+
+    def iter_rows(
+        self, sheet_name, min_row=None, max_row=None, min_col=None, max_col=None
+    ):
+        """Yield value tuples straight from openpyxl."""
+        return self.workbook[sheet_name].iter_rows(
+            min_row=min_row,
+            max_row=max_row,
+            min_col=min_col,
+            max_col=max_col,
+            values_only=True,
+        )
+
+    def close(self):
+        """Close the workbook and its zip file."""
+        self.workbook.close()
+
+
+class XlrdBackend(ExcelBackend):
+    """Read legacy .xls files with xlrd."""
+
+    name = "xlrd"
+    extensions = (".xls",)
+
+    def __init__(self, content):
+        """Open the workbook, loading sheets on demand."""
+        if not isinstance(content, (bytes, bytearray)):
+            content = content.read()
+        self.workbook = xlrd.open_workbook(file_contents=content, on_demand=True)
+
+    def _value(self, cell):
+        """Convert an xlrd cell to a python value."""
+        if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+            return None
+        if cell.ctype == xlrd.XL_CELL_DATE:
+            return xlrd.xldate.xldate_as_datetime(cell.value, self.workbook.datemode)
+        if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+            return bool(cell.value)
+        return normalize_number(cell.value)
+
+    def iter_rows(
+        self, sheet_name, min_row=None, max_row=None, min_col=None, max_col=None
+    ):
+        """Yield value tuples of a sheet."""
+        sheet = self.workbook.sheet_by_name(sheet_name)
+        rows = (
+            tuple(self._value(cell) for cell in sheet.row(index))
+            for index in range(sheet.nrows)
+        )
+        return slice_rows(rows, min_row, max_row, min_col, max_col)
+
+    def close(self):
+        """Release the loaded sheets."""
+        self.workbook.release_resources()
+
+
+class CalamineBackend(ExcelBackend):
+    """Read .xlsx, .xlsm, .xlsb, .xls and .ods files with python-calamine."""
+
+    name = "calamine"
+    extensions = (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods")
+
+    def __init__(self, content):
+        """Open the workbook."""
+        if isinstance(content, (bytes, bytearray)):
+            content = io.BytesIO(content)
+        self.workbook = python_calamine.CalamineWorkbook.from_filelike(content)
+
+    @classmethod
+    def is_available(cls):
+        """Return True when python-calamine is installed."""
+        return python_calamine is not None
+
+    def iter_rows(
+        self, sheet_name, min_row=None, max_row=None, min_col=None, max_col=None
+    ):
+        """Yield value tuples of a sheet, starting at cell A1 like openpyxl."""
+        # iter_rows skips leading empty columns, which would shift min_col/max_col
+        sheet = self.workbook.get_sheet_by_name(sheet_name)
+        rows = (
+            tuple(normalize_value(value) for value in row)
+            for row in sheet.to_python(skip_empty_area=False)
+        )
+        return slice_rows(rows, min_row, max_row, min_col, max_col)
+
+    def close(self):
+        """Close the workbook."""
+        self.workbook.close()
+
+
+BACKENDS = {
+    backend.name: backend for backend in (OpenpyxlBackend, XlrdBackend, CalamineBackend)
+}
+
+
+def get_backend(filename=None, name=None):
+    """Return the backend class for a file.
+
+    Args:
+        filename: Name of the file, used to choose a backend by extension.
+        name: Backend to use regardless of the extension, or "auto".
+    """
+    if name and name != "auto":
+        if name not in BACKENDS:
+            raise Exception(f"Excel backend {name} not supported")
+        backend = BACKENDS[name]
+        if not backend.is_available():
+            raise Exception(
+                f"Excel backend {name} needs python-calamine, install it with "
+                '`pip install "tap-sharepointsites[calamine]"`'
+            )
+        return backend
+
+    # calamine is only chosen for formats nothing else reads, so installing
+    # it never changes the records of other files
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in XlrdBackend.extensions:
+        return XlrdBackend
+    if extension in (".xlsb", ".ods"):
+        if not CalamineBackend.is_available():
+            raise Exception(
+                f"Reading {extension} files needs python-calamine, install it with "
+                '`pip install "tap-sharepointsites[calamine]"`'
+            )
+        return CalamineBackend
+    return OpenpyxlBackend
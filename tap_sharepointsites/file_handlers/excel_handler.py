@@ -1,77 +1,62 @@
 """Handle Excel files."""
 
 import logging
-import os
-import tempfile
 
-import openpyxl
+from tap_sharepointsites.file_handlers.excel_backends import get_backend
 
 LOGGER = logging.getLogger(__name__)
 
 
 class ExcelHandler:
-    """Handle Excel files."""
-
-    def __init__(self, textcontent, sheet_name, min_row, max_row, min_col, max_col):
-        """Initialize ExcelHandler."""
-        self.xlsheet = self._load_workbook(
-            textcontent, sheet_name, min_row, max_row, min_col, max_col
-        )
-
-    def _load_workbook(
-        self, textcontent, sheet_name, min_row, max_row, min_col, max_col
+    """Handle Excel files.
+
+    Rows are streamed lazily as tuples of values from a reader backend,
+    chosen by file extension unless `backend` names one.
+    """
+
+    def __init__(
+        self,
+        textcontent,
+        sheet_name,
+        min_row,
+        max_row,
+        min_col,
+        max_col,
+        filename=None,
+        backend=None,
     ):
-        """Load workbook from textcontent."""
+        """Initialize ExcelHandler with the file bytes or a seekable buffer."""
+        backend_class = get_backend(filename, backend)
+        LOGGER.debug(f"Reading {filename} with the {backend_class.name} backend")
 
-        is_windows = os.name == 'nt'
-        with tempfile.NamedTemporaryFile(mode="wb", suffix=".xlsx", delete=not is_windows) as temp:
-            temp.write(textcontent)
-            temp.flush()
-            workbook = openpyxl.load_workbook(temp.name, read_only=True, data_only=True)
-            active_sheet = workbook[sheet_name].iter_rows(
-                min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col
-            )
-            return list(active_sheet)
+        self.workbook = backend_class(textcontent)
+        self.rows = self.workbook.iter_rows(sheet_name, min_row, max_row, min_col, max_col)
+        self.header = next(self.rows, ())
 
     def get_row_iterator(self):
         """Return a generator of rows."""
-        yield from self.generator_wrapper(self.xlsheet)
+        fieldnames = self.fieldnames
+        for values in self.get_value_rows():
+            yield dict(zip(fieldnames, values))
+
+    def get_value_rows(self):
+        """Return a generator of rows as tuples of string values, in `fieldnames` order."""
+        try:
+            for row in self.rows:
+                # For some reason openpyxl is importing extra rows that are all empty
+                if all(value is None for value in row):
+                    continue  # Skip this row as it's completely empty
+
+                yield tuple(None if value is None else str(value) for value in row)
+        finally:
+            self.workbook.close()
 
     @property
     def fieldnames(self):
         """Return fieldnames."""
         fieldnames = []
-        for index, cell in enumerate(self.xlsheet[0]):
-            name = cell.value
+        for index, name in enumerate(self.header):
             if not name:
                 name = "untitled_" + str(index)
             fieldnames.append(name)
         return fieldnames
-
-    def generator_wrapper(self, reader):
-        """Wrap a reader in a generator."""
-        header_row = None
-        for row in reader:
-            to_return = {}
-            if header_row is None:
-                header_row = row
-                continue
-
-            # Check if all cells in the row are empty
-            # For some reason openpyxl is importing extra rows that are all empty
-            if all(cell.value is None for cell in row):
-                continue  # Skip this row as it's completely empty
-
-            for index, cell in enumerate(row):
-                header_cell = header_row[index]
-                formatted_key = header_cell.value
-
-                if not formatted_key:
-                    # rename empty headers to untitled
-                    formatted_key = "untitled_" + str(index)
-
-                to_return[formatted_key] = (
-                    str(cell.value) if cell.value is not None else None
-                )
-
-            yield to_return
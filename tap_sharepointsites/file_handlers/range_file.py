@@ -0,0 +1,96 @@
+"""Read a remote file through HTTP Range requests."""
+
+import io
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+# bytes fetched per range request when reading through a buffer
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+
+class HTTPRangeFile(io.RawIOBase):
+    """Seekable, read-only file backed by HTTP Range requests.
+
+    Only the byte ranges that are read get downloaded, so a reader that
+    seeks to the end of a zip file and parses a single entry touches a small
+    part of a large workbook. If the server ignores `Range`, the full body
+    of the first response is kept and served from memory.
+    """
+
+    def __init__(self, session, url, size, headers=None, auth=None):
+        """Initialize the file.
+
+        Args:
+            session: The requests session to download with.
+            url: Download url of the file.
+            size: Size of the file in bytes.
+            headers: Extra request headers.
+            auth: Authenticator for the requests.
+        """
+        super().__init__()
+        self.session = session
+        self.url = url
+        self.size = size
+        self.headers = headers or {}
+        self.auth = auth
+        self.position = 0
+        self.bytes_fetched = 0
+        self._content = None
+
+    @classmethod
+    def open(cls, session, url, size, buffer_size=DEFAULT_BUFFER_SIZE, **kwargs):
+        """Return a buffered reader over a range file."""
+        return io.BufferedReader(cls(session, url, size, **kwargs), buffer_size)
+
+    def readable(self):
+        """Return True."""
+        return True
+
+    def seekable(self):
+        """Return True."""
+        return True
+
+    def tell(self):
+        """Return the current position."""
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Move to a new position."""
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        return self.position
+
+    def readinto(self, buffer):
+        """Read up to len(buffer) bytes at the current position."""
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+
+        data = self._fetch(self.position, end)
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def _fetch(self, start, end):
+        """Return the bytes in [start, end)."""
+        if self._content is None:
+            response = self.session.get(
+                self.url,
+                headers={**self.headers, "Range": f"bytes={start}-{end - 1}"},
+                auth=self.auth,
+            )
+            response.raise_for_status()
+            self.bytes_fetched += len(response.content)
+            if response.status_code == 206:
+                return response.content
+
+            LOGGER.debug(f"Range requests not supported for {self.url}")
+            self._content = response.content
+        return self._content[start:end]
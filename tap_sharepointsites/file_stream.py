@@ -1,19 +1,66 @@
 """Stream type classes for tap-sharepointsites."""
 
 
-from datetime import datetime, timezone
+from datetime import datetime
+import io
+import multiprocessing
+import os
 import re
+import shutil
+import tempfile
 import typing as t
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from functools import cached_property
+from itertools import islice
+from urllib.parse import parse_qsl, urlparse
 
 import requests
 from singer_sdk import typing as th
+from singer_sdk.exceptions import FatalAPIError
 
 from tap_sharepointsites.client import sharepointsitesStream
-from tap_sharepointsites.file_handlers.csv_handler import CSVHandler
+from tap_sharepointsites.content_cache import content_hash
+from tap_sharepointsites.drive_walker import (
+    DriveWalker,
+    list_folder,
+    listing_params,
+    source_name,
+)
+from tap_sharepointsites.file_handlers.csv_handler import (
+    CSVHandler,
+    get_charset,
+    iter_text_lines,
+)
+from tap_sharepointsites.file_handlers.excel_backends import (
+    OpenpyxlBackend,
+    get_backend,
+)
 from tap_sharepointsites.file_handlers.excel_handler import ExcelHandler
+from tap_sharepointsites.file_handlers.range_file import HTTPRangeFile
+from tap_sharepointsites.parse_pool import (
+    iter_parsed_rows,
+    open_rows,
+    parse_file,
+    remove_files,
+    rows_path,
+)
+from tap_sharepointsites.prefetch import prefetch
+from tap_sharepointsites.row_builder import RowBuilder
+from tap_sharepointsites.run_cache import RunCache
+from tap_sharepointsites.schema_cache import SchemaCache
 from tap_sharepointsites.utils import snakecase
 
+# bytes read from a download at a time when streaming text files
+CHUNK_SIZE = 64 * 1024
+
+# files downloaded ahead while another one is parsed, and their max total size
+DEFAULT_PREFETCH_FILES = 4
+DEFAULT_PREFETCH_BYTES = 256 * 1024 * 1024
+
+# bytes of a CSV file downloaded to read its header row
+HEADER_SNIFF_BYTES = 16 * 1024
+
 
 class FilesStream(sharepointsitesStream):
     """Define custom stream."""
@@ -29,6 +76,8 @@ class FilesStream(sharepointsitesStream):
         # cache file_config so we dont need to go iterating the config list again later
 
         self.file_config = kwargs.pop("file_config")
+        # ids of the files listed so far, to forget the hashes of removed ones
+        self._listed_ids = set()
         super().__init__(*args, **kwargs)
 
     @property
@@ -39,6 +88,11 @@ class FilesStream(sharepointsitesStream):
         return url
 
 
+    @property
+    def page_size(self):
+        """Return the `$top` page size, preferring the stream config."""
+        return self.file_config.get("page_size") or super().page_size
+
     @property
     def header(self):
         """Run header function."""
@@ -50,7 +104,10 @@ class FilesStream(sharepointsitesStream):
         drive_id = self.get_drive_id()
         folder = self.file_config.get("folder")
 
-        if not folder:
+        if self.delta_sync:
+            # SharePoint only supports delta on the drive root
+            base_url = f"/drives/{drive_id}/root/delta"
+        elif not folder:
             base_url = f"/drives/{drive_id}/root/children"
         else:
             base_url = f"/drives/{drive_id}/root:/{folder}:/children"
@@ -58,138 +115,514 @@ class FilesStream(sharepointsitesStream):
         return base_url
 
     def list_all_files(self, headers=None):
-        """List all files in the drive."""
+        """List all files in the folder, and its subfolders when recursive."""
+        return self.list_files(self.get_listing_params(), headers=headers)
+
+    def list_files(self, params, headers=None):
+        """List the folder with the given params, once per run with the run cache."""
         drive_id = self.get_drive_id()
         folder = self.file_config.get("folder")
+        recursive = self.file_config.get("recursive", False)
 
-        if not folder:
-            base_url = (
-                f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root/children"
+        def load():
+            return list_folder(
+                self, drive_id, folder, headers=headers, recursive=recursive, params=params
             )
-        else:
-            base_url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root:/{folder}:/children"
 
-        while base_url:
-            response = requests.get(base_url, headers=headers, auth=self.authenticator)
-            response.raise_for_status()
-            data = response.json()
-            for item in data["value"]:
-                if "file" in item:
-                    yield item
+        cache = self._tap.run_cache
+        if cache is None:
+            return load()
+        return cache.listing(RunCache.listing_key(drive_id, folder, recursive, params), load)
+
+    def request_records(self, context: t.Optional[dict]) -> t.Iterable[dict]:
+        """Page through the folder, or walk it and its subfolders.
+
+        Recursive listings, and listings shared through the run cache, go
+        through `list_files` instead of the paginated `path` request.
+        """
+        recursive = self.file_config.get("recursive", False)
+        if self.delta_sync or (self._tap.run_cache is None and not recursive):
+            self._listed_ids = set()
+            yield from super().request_records(context)
+            return
+
+        # list without the start time, so the listing read for schema discovery
+        # is reused; parse_items drops the files modified before it
+        params = self.get_listing_params()
+        items = self.list_files(params, headers=self.header)
+        yield from self.parse_items(items)
+        if "$filter" not in params:
+            self.forget_missing_files({item["id"] for item in items if "file" in item})
+
+    def get_listing_params(self, since=None):
+        """Return the params of a folder listing, filtered server side if configured."""
+        # subfolders must be listed whatever their name or modified time
+        server_filter = self.file_config.get("server_filter", False) and not self.file_config.get(
+            "recursive", False
+        )
+        return listing_params(self.file_config["file_pattern"], since, server_filter)
+
+    @property
+    def delta_sync(self) -> bool:
+        """Whether to find changed files through the drive delta query."""
+        return bool(self.file_config.get("delta_sync"))
+
+    @cached_property
+    def walker(self):
+        """Return the walker of the delta feed, keeping its folders in state."""
+        return DriveWalker(
+            self.stream_state.setdefault("folders", {}),
+            self.file_config.get("folder"),
+            self.file_config.get("recursive", False),
+        )
 
-            base_url = data.get("@odata.nextLink")
+    def get_url_params(
+        self, context: t.Optional[dict], next_page_token: t.Optional[t.Any]
+    ) -> t.Dict[str, t.Any]:
+        """Project and filter the first request, or resume from the stored delta link."""
+        if next_page_token:
+            return super().get_url_params(context, next_page_token)
+
+        if self.delta_sync:
+            # the delta query supports $select but not $filter
+            params = listing_params(self.file_config["file_pattern"])
+            delta_link = self.stream_state.get("delta_link")
+            if delta_link:
+                params.update(parse_qsl(urlparse(delta_link).query))
+        else:
+            params = self.get_listing_params(self.get_starting_timestamp(context))
+        return self.page_sizer.apply(params)
+
+    def validate_response(self, response: requests.Response) -> None:
+        """Explain how to recover when the stored delta link has expired."""
+        if self.delta_sync and response.status_code == 410:
+            raise FatalAPIError(
+                f"Delta link for stream {self.name} has expired. "
+                "Remove its bookmark from state to run a full resync."
+            )
+        super().validate_response(response)
 
     def parse_response(self, response: requests.Response) -> t.Iterable[dict]:
         """Parse the response and return an iterator of result records."""
-        resp_values = response.json()["value"]
+        data = response.json()
+        resp_values = data["value"]
+        last_page = "@odata.deltaLink" in data
+        if self.delta_sync:
+            synced = self.stream_state.get("content_hashes", {})
+            for item in resp_values:
+                if "deleted" in item:
+                    synced.pop(item["id"], None)
+            resp_values = list(self.walker.changed_files(resp_values, last_page))
+        else:
+            self._listed_ids.update(item["id"] for item in resp_values if "file" in item)
+
+        yield from self.parse_items(resp_values)
+
+        # Only reached once every file of the final page has been emitted
+        if self.delta_sync and last_page:
+            self.stream_state["delta_link"] = data["@odata.deltaLink"]
+        elif not self.delta_sync and "@odata.nextLink" not in data:
+            # a filtered listing does not show every file of the folder
+            if "$filter" not in dict(parse_qsl(urlparse(response.request.url).query)):
+                self.forget_missing_files(self._listed_ids)
+
+    def parse_items(self, items):
+        """Parse the matching files among drive items into records."""
         files_since = (
             self.get_starting_timestamp(self.context) or datetime.fromisoformat("1900-01-01T00:00:00Z")
         )
 
-        for record in resp_values:
-            if (
-                "file" in record.keys()
-                and re.match(self.file_config["file_pattern"], record["name"])
-                and datetime.fromisoformat(record["lastModifiedDateTime"]) > files_since
-            ):
-
-                if self.file_config["file_type"] == "csv":
-                    file = self.get_file_for_row(record)
-                    dr = CSVHandler(
-                        file, self.file_config.get("delimiter", ",")
-                    ).get_dictreader()
-
-                elif self.file_config["file_type"] == "excel":
-                    file = self.get_file_for_row(record, text=False)
-                    sheet_name = self.file_config.get("sheet_name", "Sheet1")
-                    min_row = self.file_config.get("min_row", None)
-                    max_row = self.file_config.get("max_row", None)
-                    min_col = self.file_config.get("min_col", None)
-                    max_col = self.file_config.get("max_col", None)
-                    dr = ExcelHandler(
-                        file, sheet_name, min_row, max_row, min_col, max_col
-                    ).get_row_iterator()
-                else:
-                    filetype_name = self.file_config.get("file_type", "unknown")
-                    raise Exception(f"File type { filetype_name } not supported (yet)")
-
-                for i, row in enumerate(dr):
-
-                    if self.file_config.get("clean_colnames", True):
-                        row = {snakecase(k): v for k, v in row.items()}
-
-                    row.update(
-                        {
-                            "_sdc_source_file": record["name"],
-                            "_sdc_row_num": i,
-                            "_sdc_loaded_at": str(datetime.now(timezone.utc)),
-                            "lastModifiedDateTime": record["lastModifiedDateTime"],
-                        }
-                    )
-
-                    yield row
-
-    @cached_property
-    def schema(self):
-        """Create a schema for a *SV file."""
-        all_files = self.list_all_files(headers=self.header)
+        records = [
+            record
+            for record in items
+            if "file" in record.keys()
+            and re.match(self.file_config["file_pattern"], source_name(record))
+            and datetime.fromisoformat(record["lastModifiedDateTime"]) > files_since
+        ]
 
-        for file in all_files:
-            if re.match(self.file_config["file_pattern"], file["name"]):
-
-                if self.file_config["file_type"] == "csv":
-                    file = self.get_file_for_row(file)
-                    dr = CSVHandler(
-                        file, self.file_config.get("delimiter", ",")
-                    ).get_dictreader()
-
-                elif self.file_config["file_type"] == "excel":
-                    file = self.get_file_for_row(file, text=False)
-                    sheet_name = self.file_config.get("sheet_name", "Sheet1")
-                    min_row = self.file_config.get("min_row", None)
-                    max_row = self.file_config.get("max_row", None)
-                    min_col = self.file_config.get("min_col", None)
-                    max_col = self.file_config.get("max_col", None)
-                    dr = ExcelHandler(
-                        file, sheet_name, min_row, max_row, min_col, max_col
-                    )
+        if self.file_config.get("skip_unchanged"):
+            records = [record for record in records if not self.is_unchanged(record)]
 
-                properties = th.PropertiesList()
+        processes = self.file_config.get("parse_processes", 0)
+        if processes:
+            files = self.parse_files_in_processes(records, processes)
+        else:
+            files = self.parse_files(records)
 
-                fieldnames = [name for name in dr.fieldnames]
+        for record, fieldnames, rows in files:
+            builder = RowBuilder(
+                fieldnames, record, self.file_config.get("clean_colnames", True)
+            )
+            yield from builder.build_all(rows)
+            if self.file_config.get("skip_unchanged"):
+                synced = self.stream_state.setdefault("content_hashes", {})
+                synced[record["id"]] = content_hash(record)
+
+    def forget_missing_files(self, listed_ids):
+        """Drop the content hashes of files that are no longer in the folder."""
+        synced = self.stream_state.get("content_hashes", {})
+        for file_id in set(synced) - set(listed_ids):
+            del synced[file_id]
+
+    def is_unchanged(self, record):
+        """Return True if a file has the same content as when it was last synced."""
+        synced = self.stream_state.get("content_hashes", {}).get(record.get("id"))
+        if synced is None or synced != content_hash(record):
+            return False
+        self.logger.info(f"Skipping {source_name(record)}, its content is unchanged")
+        return True
+
+    def prefetch(self, records, download):
+        """Download upcoming files to temp files in parallel, as configured for the stream."""
+        return prefetch(
+            records,
+            download,
+            self.file_config.get("prefetch_files", DEFAULT_PREFETCH_FILES),
+            self.file_config.get("prefetch_max_bytes", DEFAULT_PREFETCH_BYTES),
+            discard=lambda download: os.remove(download[0]),
+        )
 
-                if self.file_config.get("clean_colnames", True):
-                    fieldnames = [snakecase(name) for name in fieldnames]
+    def parse_files(self, records):
+        """Yield (record, fieldnames, rows) per file, parsing in this process.
+
+        Prefetched files are read from temp files, and the others are
+        streamed, so no whole file is held in memory.
+        """
+        # the next files download while the current one is parsed
+        for record, download in self.prefetch(records, self.download_to_file):
+            if download is None:
+                yield (record, *self.stream_rows(record))
+                continue
+
+            path, charset = download
+            try:
+                with open(path, "rb") as file:
+                    yield (record, *open_rows(file, record["name"], self.file_config, charset))
+            finally:
+                os.remove(path)
+
+    def stream_rows(self, record):
+        """Return the column names and value rows of a file, reading it as it downloads."""
+        if self.file_config["file_type"] == "csv":
+            return CSVHandler(
+                self.get_file_lines(record), self.file_config.get("delimiter", ",")
+            ).get_value_rows()
+
+        elif self.file_config["file_type"] == "excel":
+            handler = ExcelHandler(
+                self.get_file_buffer(record),
+                self.file_config.get("sheet_name", "Sheet1"),
+                self.file_config.get("min_row", None),
+                self.file_config.get("max_row", None),
+                self.file_config.get("min_col", None),
+                self.file_config.get("max_col", None),
+                filename=record["name"],
+                backend=self.file_config.get("excel_backend"),
+            )
+            return handler.fieldnames, handler.get_value_rows()
+
+        filetype_name = self.file_config.get("file_type", "unknown")
+        raise Exception(f"File type { filetype_name } not supported (yet)")
+
+    def parse_files_in_processes(self, records, processes):
+        """Yield (record, fieldnames, rows) per file, parsing in worker processes.
+
+        Files are downloaded to temp files, which workers parse into batches
+        of row tuples. Up to `processes` files are parsed ahead of the one
+        whose rows are being emitted.
+        """
+        window = deque()
+        downloads = self.prefetch(records, self.download_to_file)
+        # forking would copy the tap's lock and thread state into the workers
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            try:
+                for record, download in downloads:
+                    path, charset = download or self.download_to_file(record)
+                    future = pool.submit(
+                        parse_file, path, record["name"], self.file_config, charset
+                    )
+                    window.append((record, path, future))
+                    if len(window) > processes:
+                        yield from self._parsed_file(*window.popleft())
+
+                while window:
+                    yield from self._parsed_file(*window.popleft())
+            finally:
+                # remove the files queued for download or parsing when stopped early
+                downloads.close()
+                for _, path, future in window:
+                    if not future.cancel():
+                        wait([future])
+                    remove_files(path, rows_path(path))
+
+    def _parsed_file(self, record, path, future):
+        """Wait for a worker to parse a file and yield its record, fieldnames and rows."""
+        try:
+            out_path = future.result()
+        except BaseException:
+            remove_files(rows_path(path))
+            raise
+        finally:
+            os.remove(path)
+
+        fieldnames, rows = iter_parsed_rows(out_path)
+        try:
+            yield record, fieldnames, rows
+        finally:
+            rows.close()
 
-                for field in fieldnames:
-                    properties.append(th.Property(field, th.StringType(nullable=True)))
-                
-                properties.append(th.Property("_sdc_source_file", th.StringType)),
-                properties.append(th.Property("_sdc_row_num", th.IntegerType)),
-                properties.append(th.Property("_sdc_loaded_at", th.DateTimeType)),
-                properties.append(th.Property("lastModifiedDateTime", th.DateTimeType)),
+    @cached_property
+    def schema(self):
+        """Create a schema for a *SV file, reusing a cached one if files are unchanged."""
+        cache = self._tap.schema_cache
+        key = SchemaCache.cache_key(self.config["api_url"], self.file_config)
+        cached = cache.get(key) if cache else None
+        if cached and cache.is_fresh(cached):
+            self.logger.info(f"Using cached schema for {self.name}")
+            return cached["schema"]
 
-                return properties.to_dict()
+        all_files = self.list_all_files(headers=self.header)
+        matching = (
+            file
+            for file in all_files
+            if re.match(self.file_config["file_pattern"], source_name(file))
+        )
+        sample = list(islice(matching, self.file_config.get("schema_sample_files", 1)))
+        if not sample:
+            raise Exception("There is no spoon. Nor files, for that matter.")
 
+        if cached and cached["files"] == SchemaCache.file_tags(sample):
+            self.logger.info(f"Using cached schema for {self.name}, files are unchanged")
+            schema = cached["schema"]
         else:
-            raise Exception("There is no spoon. Nor files, for that matter.")
+            schema = self.discover_schema(sample)
+        if cache:
+            cache.put(key, sample, schema)
+        return schema
+
+    def discover_schema(self, sample):
+        """Build a schema from the union of the headers of sample files."""
+        # headers are read in parallel like prefetched files
+        max_workers = min(
+            len(sample), max(self.file_config.get("prefetch_files", DEFAULT_PREFETCH_FILES), 1)
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            headers = list(executor.map(self.get_fieldnames, sample))
+
+        # union of the headers, in the order they are first seen
+        fieldnames = list(dict.fromkeys(name for header in headers for name in header))
+
+        if self.file_config.get("clean_colnames", True):
+            fieldnames = [snakecase(name) for name in fieldnames]
+
+        properties = th.PropertiesList()
+        for field in fieldnames:
+            properties.append(th.Property(field, th.StringType(nullable=True)))
+
+        properties.append(th.Property("_sdc_source_file", th.StringType)),
+        properties.append(th.Property("_sdc_row_num", th.IntegerType)),
+        properties.append(th.Property("_sdc_loaded_at", th.DateTimeType)),
+        properties.append(th.Property("lastModifiedDateTime", th.DateTimeType)),
+
+        return properties.to_dict()
+
+    def get_fieldnames(self, file):
+        """Read the header of a file, downloading as little of it as possible."""
+        if self.file_config["file_type"] == "csv":
+            head, charset = self.get_file_head(file, HEADER_SNIFF_BYTES)
+            if b"\n" in head or len(head) < HEADER_SNIFF_BYTES:
+                # decoded like the rows, so the column names match
+                lines = iter_text_lines([head], self.file_config.get("encoding"), charset)
+            else:
+                # the header row is longer than the sniffed prefix
+                lines = self.get_file_lines(file)
+            dr = CSVHandler(lines, self.file_config.get("delimiter", ",")).get_dictreader()
+            return dr.fieldnames or []
+
+        elif self.file_config["file_type"] == "excel":
+            backend = get_backend(file["name"], self.file_config.get("excel_backend"))
+            cached = self.cached_content(file)
+            if cached is not None:
+                content = io.BytesIO(cached[0])
+            elif backend is OpenpyxlBackend and "size" in file:
+                # openpyxl reads the zip directory and the first row only
+                content = HTTPRangeFile.open(
+                    self.requests_session,
+                    file["@microsoft.graph.downloadUrl"],
+                    file["size"],
+                    headers=self.header,
+                    auth=self.authenticator,
+                )
+            else:
+                content = self.get_file_buffer(file)
+
+            dr = ExcelHandler(
+                content,
+                self.file_config.get("sheet_name", "Sheet1"),
+                self.file_config.get("min_row", None),
+                self.file_config.get("max_row", None),
+                self.file_config.get("min_col", None),
+                self.file_config.get("max_col", None),
+                filename=file["name"],
+                backend=backend.name,
+            )
+            dr.workbook.close()
+            return dr.fieldnames
+
+        filetype_name = self.file_config.get("file_type", "unknown")
+        raise Exception(f"File type { filetype_name } not supported (yet)")
 
     def get_drive_id(self):
         """Get drives in the sharepoint site."""
-        drive = requests.get(f'{self.config["api_url"]}drive', headers=self.header, auth=self.authenticator)
-
-        if not drive.ok:
-            raise Exception(f"Error getting drive: {drive.status_code}: {drive.text}")
-        return drive.json()["id"]
+        return self._tap.id_resolver.drive_id(self)
 
-    def get_file_for_row(self, row_data, text=True):
-        """Get the file for a row."""
-        file = requests.get(
-            row_data["@microsoft.graph.downloadUrl"], headers=self.header, auth=self.authenticator
+    def refresh_download_url(self, row_data):
+        """Fetch a new pre-authenticated download url for a drive item."""
+        drive_id = self.get_drive_id()
+        response = self.requests_session.get(
+            f"{self.url_base}/drives/{drive_id}/items/{row_data['id']}",
+            params={"$select": "id,@microsoft.graph.downloadUrl"},
+            headers=self.header,
+            auth=self.authenticator,
         )
-        file.raise_for_status()
+        response.raise_for_status()
+        row_data["@microsoft.graph.downloadUrl"] = response.json()[
+            "@microsoft.graph.downloadUrl"
+        ]
+
+    def open_download(self, row_data, headers=None):
+        """Start streaming a file, refreshing its download url once if it expired."""
+        for attempt in range(2):
+            response = self.requests_session.get(
+                row_data["@microsoft.graph.downloadUrl"],
+                headers={**self.header, **(headers or {})},
+                auth=self.authenticator,
+                stream=True,
+            )
+            # download urls are only valid for a short while
+            if response.status_code in (401, 403) and not attempt and "id" in row_data:
+                self.logger.info(f"Refreshing expired download url of {row_data['name']}")
+                response.close()
+                self.refresh_download_url(row_data)
+                continue
+            response.raise_for_status()
+            return response
+
+    def download_file(self, row_data):
+        """Download a file into an in-memory buffer, returning it and its charset."""
+        cache = self._tap.run_cache
+        if cache is not None:
+            content, charset = cache.content(row_data, lambda: self.download_bytes(row_data))
+            return io.BytesIO(content), charset
+
+        content, charset = self.download_bytes(row_data)
+        return io.BytesIO(content), charset
+
+    def download_bytes(self, row_data):
+        """Download a file, returning its content and charset, via the content cache."""
+        content_cache = self._tap.content_cache
+        if content_cache is not None:
+            cached = content_cache.get(row_data)
+            if cached is not None:
+                return cached
+
+        buffer = io.BytesIO()
+        with self.open_download(row_data) as response:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                buffer.write(chunk)
+            charset = get_charset(response.headers.get("Content-Type"))
+
+        content = buffer.getvalue()
+        if content_cache is not None:
+            content_cache.put(row_data, content, charset)
+        return content, charset
+
+    def cached_content(self, row_data):
+        """Return the (content, charset) of a file from the run or content cache, or None."""
+        run_cache = self._tap.run_cache
+        key = RunCache.content_key(row_data)
+        cached = run_cache.get(key) if run_cache is not None and key is not None else None
+        if cached is None and self._tap.content_cache is not None:
+            cached = self._tap.content_cache.get(row_data)
+        return cached
+
+    def download_to_file(self, row_data):
+        """Download a file into a temp file, returning its path and charset.
+
+        With the run cache, the file is stored on disk for the rest of the
+        run and later calls get a copy of it.
+        """
+        cache = self._tap.run_cache
+        if cache is not None:
+            return cache.file(row_data, lambda: self._download_to_file(row_data))
+        return self._download_to_file(row_data)
+
+    def _download_to_file(self, row_data):
+        """Download a file into a new temp file, via the content cache."""
+        suffix = os.path.splitext(row_data["name"])[1]
+        content_cache = self._tap.content_cache
+        cached = content_cache.open_file(row_data) if content_cache is not None else None
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as file:
+            if cached is not None:
+                with cached[0] as source:
+                    shutil.copyfileobj(source, file)
+                return file.name, cached[1]
+
+            with self.open_download(row_data) as response:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    file.write(chunk)
+                charset = get_charset(response.headers.get("Content-Type"))
+
+        if content_cache is not None:
+            content_cache.put_file(row_data, file.name, charset)
+        return file.name, charset
+
+    def get_file_head(self, row_data, size):
+        """Download the first `size` bytes of a file with a Range request.
+
+        Returns the bytes and the charset of the response.
+        """
+        cached = self.cached_content(row_data)
+        if cached is not None:
+            return cached[0][:size], cached[1]
+
+        with self.open_download(row_data, {"Range": f"bytes=0-{size - 1}"}) as response:
+            # servers ignoring Range send the whole file, read just the start
+            head = b""
+            for chunk in response.iter_content(CHUNK_SIZE):
+                head += chunk
+                if len(head) >= size:
+                    break
+            charset = get_charset(response.headers.get("Content-Type"))
+        return head[:size], charset
+
+    def get_file_lines(self, row_data):
+        """Yield the lines of a text file as it downloads, without buffering it.
+
+        With the run or content cache, the file is downloaded to disk
+        first, so it can be read from there later.
+        """
+        if self._tap.run_cache is not None or self._tap.content_cache is not None:
+            path, charset = self.download_to_file(row_data)
+            try:
+                with open(path, "rb") as file:
+                    yield from iter_text_lines(
+                        iter(lambda: file.read(CHUNK_SIZE), b""),
+                        self.file_config.get("encoding"),
+                        charset,
+                    )
+            finally:
+                os.remove(path)
+            return
+
+        with self.open_download(row_data) as response:
+            yield from iter_text_lines(
+                response.iter_content(CHUNK_SIZE),
+                self.file_config.get("encoding"),
+                get_charset(response.headers.get("Content-Type")),
+            )
 
-        if text:
-            return file.text
-        else:
-            return file.content
+    def get_file_buffer(self, row_data):
+        """Download a file chunk by chunk into an in-memory buffer."""
+        return self.download_file(row_data)[0]
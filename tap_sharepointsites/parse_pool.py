@@ -0,0 +1,134 @@
+"""Parse downloaded files in worker processes."""
+
+import logging
+import os
+import pickle
+from itertools import islice
+
+from tap_sharepointsites.file_handlers.csv_handler import CSVHandler, iter_text_lines
+from tap_sharepointsites.file_handlers.excel_handler import ExcelHandler
+
+LOGGER = logging.getLogger(__name__)
+
+# rows pickled together when a worker writes its results
+BATCH_SIZE = 10_000
+
+# bytes read at a time from a downloaded CSV file
+CHUNK_SIZE = 64 * 1024
+
+
+def open_rows(file, filename, file_config, charset=None):
+    """Return the column names and an iterator of value rows of an open downloaded file.
+
+    The caller closes the file once it is done with the rows.
+    """
+    if file_config["file_type"] == "csv":
+        lines = iter_text_lines(
+            iter(lambda: file.read(CHUNK_SIZE), b""),
+            file_config.get("encoding"),
+            charset,
+        )
+        return CSVHandler(lines, file_config.get("delimiter", ",")).get_value_rows()
+
+    elif file_config["file_type"] == "excel":
+        handler = ExcelHandler(
+            file,
+            file_config.get("sheet_name", "Sheet1"),
+            file_config.get("min_row", None),
+            file_config.get("max_row", None),
+            file_config.get("min_col", None),
+            file_config.get("max_col", None),
+            filename=filename,
+            backend=file_config.get("excel_backend"),
+        )
+        return handler.fieldnames, handler.get_value_rows()
+
+    filetype_name = file_config.get("file_type", "unknown")
+    raise Exception(f"File type { filetype_name } not supported (yet)")
+
+
+def rows_path(path):
+    """Return the path `parse_file` writes the rows of a downloaded file to."""
+    return f"{path}.rows"
+
+
+def remove_files(*paths):
+    """Remove files, ignoring those that do not exist."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def parse_file(path, filename, file_config, charset=None):
+    """Parse a downloaded file into a file of pickled row batches.
+
+    Runs in a worker process. The output file starts with the column names,
+    followed by batches of value rows in the same order. Returns its path.
+    """
+    out_path = rows_path(path)
+    with open(path, "rb") as file, open(out_path, "wb") as out:
+        fieldnames, rows = open_rows(file, filename, file_config, charset)
+        pickle.dump(list(fieldnames), out)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            pickle.dump(batch, out)
+
+    return out_path
+
+
+class ParsedRows:
+    """Iterator over the value rows of a file written by `parse_file`.
+
+    The file is deleted once all rows have been read, or when the iterator
+    is closed, even if it was never started.
+    """
+
+    def __init__(self, out_path):
+        """Open the file and read its column names."""
+        self.out_path = out_path
+        self.file = open(out_path, "rb")
+        self.batch = iter(())
+        try:
+            self.fieldnames = pickle.load(self.file)
+        except BaseException:
+            self.close()
+            raise
+
+    def __iter__(self):
+        """Return the iterator itself."""
+        return self
+
+    def __next__(self):
+        """Return the next row, reading the next batch when needed."""
+        while True:
+            try:
+                return next(self.batch)
+            except StopIteration:
+                pass
+            if self.file.closed:
+                raise StopIteration
+            try:
+                self.batch = iter(pickle.load(self.file))
+            except EOFError:
+                self.close()
+                raise StopIteration
+
+    def close(self):
+        """Close and delete the file."""
+        if not self.file.closed:
+            self.file.close()
+            os.remove(self.out_path)
+
+
+def iter_parsed_rows(out_path):
+    """Return the column names and value rows of a file written by `parse_file`.
+
+    The file is deleted once all rows have been read, or when the rows are
+    closed.
+    """
+    rows = ParsedRows(out_path)
+    return rows.fieldnames, rows
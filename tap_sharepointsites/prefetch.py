@@ -0,0 +1,64 @@
+"""Download upcoming files in parallel while earlier ones are parsed."""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+LOGGER = logging.getLogger(__name__)
+
+
+def prefetch(records, download, max_files=4, max_bytes=256 * 1024 * 1024, discard=None):
+    """Yield (record, download result) pairs in order, downloading ahead.
+
+    Up to `max_files` downloads run in parallel, and together they hold at
+    most `max_bytes`, based on the `size` Graph reports for each file.
+    Files larger than `max_bytes` are not prefetched; they are yielded
+    with None so the caller can stream them.
+
+    Args:
+        records: Drive items to download, in the order to yield them.
+        download: Function downloading one drive item.
+        max_files: Max number of files downloaded or waiting to be parsed.
+        max_bytes: Max bytes of files downloaded or waiting to be parsed.
+        discard: Function called with the downloads that are never yielded,
+            when the caller stops early.
+    """
+    records = iter(records)
+    if max_files < 1:
+        for record in records:
+            yield record, None
+        return
+
+    queue = deque()
+    queued_bytes = 0
+    upcoming = next(records, None)
+
+    executor = ThreadPoolExecutor(max_workers=max_files, thread_name_prefix="prefetch")
+    try:
+        while upcoming is not None or queue:
+            while upcoming is not None and len(queue) < max_files:
+                size = upcoming.get("size") or 0
+                if size > max_bytes:
+                    queue.append((upcoming, None, 0))
+                elif not queue or queued_bytes + size <= max_bytes:
+                    queue.append((upcoming, executor.submit(download, upcoming), size))
+                    queued_bytes += size
+                else:
+                    break
+                upcoming = next(records, None)
+
+            record, future, size = queue.popleft()
+            result = future.result() if future is not None else None
+            yield record, result
+            # the file is kept until the caller is done with it
+            queued_bytes -= size
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if discard is not None:
+            for _, future, _ in queue:
+                if (
+                    future is not None
+                    and not future.cancelled()
+                    and future.exception() is None
+                ):
+                    discard(future.result())
@@ -0,0 +1,118 @@
+"""Run-scoped cache for site, drive and list identifiers."""
+
+import logging
+import threading
+from urllib.parse import quote
+
+from tap_sharepointsites.batch import GraphBatchClient
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IdResolver:
+    """Resolve Graph identifiers at most once per run.
+
+    Ids are kept in a plain dict keyed by kind and `api_url`, so the same
+    mapping can be persisted in (and seeded from) the Singer state. All
+    lookups and changes to `ids` happen under `lock`, so concurrently
+    syncing streams never resolve the same id twice.
+
+    The dicts in `ids` are replaced rather than changed in place, so the
+    tap can copy its state while ids are being resolved without taking
+    `lock`.
+    """
+
+    KINDS = ("sites", "drives", "lists")
+
+    def __init__(self, ids=None):
+        """Initialize the resolver, optionally from previously resolved ids."""
+        self.ids = ids if ids is not None else {}
+        for kind in self.KINDS:
+            self.ids.setdefault(kind, {})
+        self.lock = threading.RLock()
+
+    def _store(self, kind, key, value):
+        """Add a resolved id, replacing the dict of its kind."""
+        self.ids[kind] = {**self.ids[kind], key: value}
+
+    def _resolve(self, kind, key, stream, url, error_name):
+        """Return a cached id, or fetch `url` and cache its `id`."""
+        with self.lock:
+            if key not in self.ids[kind]:
+                response = stream.requests_session.get(
+                    url, headers=stream.http_headers, auth=stream.authenticator
+                )
+                if not response.ok:
+                    raise Exception(
+                        f"Error getting {error_name}: "
+                        f"{response.status_code}: {response.text}"
+                    )
+                self._store(kind, key, response.json()["id"])
+                LOGGER.debug(f"Resolved {error_name} id for {key}")
+            return self.ids[kind][key]
+
+    def site_id(self, stream):
+        """Return the id of the site at the stream's `api_url`."""
+        api_url = stream.config["api_url"]
+        return self._resolve("sites", api_url, stream, api_url, "site")
+
+    def drive_id(self, stream):
+        """Return the id of the default drive of the stream's site."""
+        api_url = stream.config["api_url"]
+        return self._resolve("drives", api_url, stream, f"{api_url}drive", "drive")
+
+    def list_id(self, stream, list_name):
+        """Return the id of a list in the stream's site.
+
+        On a cache miss, every list configured for the tap is resolved in
+        the same `$batch` call. Only a failure for this list raises.
+        """
+        api_url = stream.config["api_url"]
+        key = f"{api_url}|{list_name}"
+        with self.lock:
+            if key not in self.ids["lists"]:
+                names = set(stream.config.get("lists") or []) | {list_name}
+                failed = self._resolve_lists(stream, sorted(names))
+                if list_name in failed:
+                    raise list_error({list_name: failed[list_name]})
+            return self.ids["lists"][key]
+
+    def list_ids(self, stream, list_names):
+        """Resolve the ids of many lists with batched requests.
+
+        Raises one exception reporting every list that failed.
+        """
+        api_url = stream.config["api_url"]
+        with self.lock:
+            failed = self._resolve_lists(stream, list_names)
+            if failed:
+                raise list_error(failed)
+            return [self.ids["lists"][f"{api_url}|{name}"] for name in list_names]
+
+    def _resolve_lists(self, stream, list_names):
+        """Resolve the missing ids of lists, returning the failed responses by name."""
+        api_url = stream.config["api_url"]
+        missing = [
+            name for name in list_names if f"{api_url}|{name}" not in self.ids["lists"]
+        ]
+
+        # names may hold spaces, `#` or `?`
+        urls = [f"{api_url}lists/{quote(name, safe='')}?$select=id" for name in missing]
+        failed = {}
+        for name, item in zip(missing, GraphBatchClient(stream).get(urls)):
+            if not item.ok:
+                failed[name] = item
+                continue
+            self._store("lists", f"{api_url}|{name}", item.body["id"])
+            LOGGER.debug(f"Resolved list id for {api_url}|{name}")
+        return failed
+
+
+def list_error(failed):
+    """Return an exception reporting the lists whose id could not be resolved."""
+    return Exception(
+        "; ".join(
+            f"Error getting list {name}: {item.status_code}: {item.body}"
+            for name, item in failed.items()
+        )
+    )
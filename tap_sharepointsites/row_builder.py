@@ -0,0 +1,57 @@
+"""Build file stream records with work done once per file."""
+
+from datetime import datetime, timezone
+
+from tap_sharepointsites.drive_walker import source_name
+from tap_sharepointsites.utils import snakecase
+
+# key of values beyond the header, as in csv.DictReader(restkey=...)
+EXTRA_KEY = "_sdc_extra"
+
+
+class RowBuilder:
+    """Turn rows of values into records of one file.
+
+    Column names are cleaned and the `_sdc_*` metadata is computed once,
+    so building a record is a single dict construction per row.
+    """
+
+    def __init__(self, fieldnames, record, clean_colnames=True):
+        """Initialize the builder.
+
+        Args:
+            fieldnames: Column names of the file, in row order.
+            record: The drive item of the file.
+            clean_colnames: Whether to convert column names to snake_case.
+        """
+        self.keys = (
+            [snakecase(name) for name in fieldnames]
+            if clean_colnames
+            else list(fieldnames)
+        )
+        self.width = len(self.keys)
+        self.metadata = {
+            "_sdc_source_file": source_name(record),
+            "_sdc_row_num": None,
+            "_sdc_loaded_at": str(datetime.now(timezone.utc)),
+            "lastModifiedDateTime": record["lastModifiedDateTime"],
+        }
+
+    def build(self, values, row_num):
+        """Return the record of a row of values."""
+        row = dict(zip(self.keys, values))
+        width, count = self.width, len(values)
+        if count != width:
+            if count > width:
+                row[EXTRA_KEY] = list(values[width:])
+            else:
+                # missing trailing columns are null, as in csv.DictReader
+                row.update(dict.fromkeys(self.keys[count:]))
+        row.update(self.metadata)
+        row["_sdc_row_num"] = row_num
+        return row
+
+    def build_all(self, rows):
+        """Yield the records of an iterator of rows of values."""
+        for row_num, values in enumerate(rows):
+            yield self.build(values, row_num)
@@ -0,0 +1,191 @@
+"""Folder listings and file contents shared by the streams of one run."""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# keys are loaded under one of a fixed set of locks, so the locks never pile up
+KEY_LOCKS = 64
+
+
+class RunCache:
+    """Keep folder listings and downloaded files for the rest of a run.
+
+    Listings are kept in memory, keyed by drive, folder and query params.
+    File contents are keyed by item id and `cTag`, so a file changed during
+    the run is downloaded again. Contents are held in memory up to
+    `max_bytes`; the least recently used ones beyond that are spilled to
+    temp files, and files downloaded to disk are added there directly. The
+    directory is removed when the cache is closed.
+
+    Loading a key is serialized, so streams asking for the same folder or
+    file at the same time list or download it once.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=None):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Max bytes of file contents kept in memory.
+            spill_dir: Directory to create the spill directory in.
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = tempfile.mkdtemp(prefix="tap-sharepointsites-", dir=spill_dir)
+        self.memory_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCKS)]
+        self._listings = {}
+        # key -> (content, charset), least recently used first
+        self._memory = OrderedDict()
+        # key -> (spill file path, charset)
+        self._spilled = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a run cache from the tap config, or None if disabled."""
+        if not config.get("run_cache"):
+            return None
+        return cls(
+            config.get("run_cache_max_bytes", DEFAULT_MAX_BYTES),
+            config.get("run_cache_dir"),
+        )
+
+    @staticmethod
+    def listing_key(drive_id, folder, recursive, params):
+        """Return the cache key of a folder listing."""
+        return (
+            drive_id,
+            (folder or "").strip("/"),
+            recursive,
+            tuple(sorted(params.items())),
+        )
+
+    @staticmethod
+    def content_key(record):
+        """Return the cache key of a file's content, or None if it has no identity."""
+        tag = record.get("cTag") or record.get("eTag")
+        if "id" not in record or not tag:
+            return None
+        return (record["id"], tag)
+
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % KEY_LOCKS]
+
+    def listing(self, key, load):
+        """Return the cached listing of a key, calling `load` to list it if missing."""
+        with self._key_lock(key):
+            if key not in self._listings:
+                self._listings[key] = list(load())
+            return self._listings[key]
+
+    def content(self, record, load):
+        """Return the (content, charset) of a file, calling `load` to download it if missing."""
+        key = self.content_key(record)
+        if key is None:
+            return load()
+
+        with self._key_lock(key):
+            cached = self.get(key)
+            if cached is None:
+                cached = load()
+                self.put(key, *cached)
+            return cached
+
+    def file(self, record, load):
+        """Return (path, charset) of a new temp file holding a file's content.
+
+        The file is copied from the cache, or else `load` downloads it to a
+        temp file, which is added to the cache on disk without reading it
+        into memory. The caller owns the returned file.
+        """
+        key = self.content_key(record)
+        if key is None:
+            return load()
+
+        suffix = os.path.splitext(record.get("name", ""))[1]
+        with self._key_lock(key):
+            with self._lock:
+                in_memory = self._memory.get(key)
+                spilled = self._spilled.get(key)
+
+            if in_memory is None and spilled is None:
+                path, charset = load()
+                self._add_file(key, path, charset)
+                return path, charset
+
+            fd, path = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+            if in_memory is not None:
+                with open(path, "wb") as file:
+                    file.write(in_memory[0])
+                return path, in_memory[1]
+            shutil.copyfile(spilled[0], path)
+            return path, spilled[1]
+
+    def _add_file(self, key, path, charset):
+        """Store a downloaded file on disk, as a hard link when possible."""
+        cached_path = os.path.join(self.spill_dir, uuid.uuid4().hex)
+        try:
+            try:
+                os.link(path, cached_path)
+            except OSError:
+                shutil.copyfile(path, cached_path)
+        except OSError as ex:
+            LOGGER.warning(f"Could not cache file in {self.spill_dir}: {ex}")
+            return
+        with self._lock:
+            self._spilled[key] = (cached_path, charset)
+
+    def get(self, key):
+        """Return the cached (content, charset) of a key, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            spilled = self._spilled.get(key)
+
+        if spilled is None:
+            return None
+        path, charset = spilled
+        with open(path, "rb") as file:
+            return file.read(), charset
+
+    def put(self, key, content, charset=None):
+        """Store the content of a file, spilling older contents to disk."""
+        with self._lock:
+            if key in self._memory or key in self._spilled:
+                return
+            self._memory[key] = (content, charset)
+            self.memory_bytes += len(content)
+            while self.memory_bytes > self.max_bytes and self._memory:
+                self._spill(*self._memory.popitem(last=False))
+
+    def _spill(self, key, value):
+        """Write an evicted content to disk."""
+        content, charset = value
+        self.memory_bytes -= len(content)
+        fd, path = tempfile.mkstemp(dir=self.spill_dir)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+        except OSError as ex:
+            LOGGER.warning(f"Could not spill cached file to {path}: {ex}")
+            return
+        self._spilled[key] = (path, charset)
+
+    def close(self):
+        """Drop all cached data and remove the spill directory."""
+        with self._lock:
+            self._listings.clear()
+            self._memory.clear()
+            self._spilled.clear()
+            self.memory_bytes = 0
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -0,0 +1,92 @@
+"""On-disk cache of discovered file stream schemas."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SchemaCache:
+    """Keep discovered schemas in a JSON file between runs.
+
+    Entries are keyed by a hash of the stream config and hold the schema
+    with the `cTag` of every file it was discovered from. An entry is reused
+    while those tags are unchanged, and within `ttl` seconds of its last
+    validation it is reused without listing the folder at all.
+    """
+
+    def __init__(self, path, ttl=None):
+        """Initialize the cache.
+
+        Args:
+            path: JSON file holding the cache.
+            ttl: Seconds an entry is trusted without checking the files.
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a schema cache from the tap config, or None if disabled."""
+        if not config.get("schema_cache_path"):
+            return None
+        return cls(config["schema_cache_path"], config.get("schema_cache_ttl"))
+
+    @staticmethod
+    def cache_key(*parts):
+        """Return the cache key of config values."""
+        data = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def file_tags(files):
+        """Return the identity of the files a schema was discovered from."""
+        return [
+            [file.get("id"), file.get("cTag") or file.get("eTag")] for file in files
+        ]
+
+    def _load(self):
+        """Read the cache file, ignoring a missing or unreadable file."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as ex:
+            LOGGER.warning(f"Ignoring unreadable schema cache {self.path}: {ex}")
+            return {}
+
+    def _save(self):
+        """Write the cache file atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """Return the cached entry of a key, or None."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_fresh(self, entry):
+        """Return True if an entry may be used without checking its files."""
+        return bool(self.ttl) and time.time() - entry["validated_at"] < self.ttl
+
+    def put(self, key, files, schema):
+        """Store the schema discovered from `files`."""
+        with self._lock:
+            self._entries[key] = {
+                "files": self.file_tags(files),
+                "schema": schema,
+                "validated_at": time.time(),
+            }
+            try:
+                self._save()
+            except OSError as ex:
+                LOGGER.warning(f"Could not write schema cache {self.path}: {ex}")
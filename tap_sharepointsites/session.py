@@ -0,0 +1,165 @@
+"""Shared, pooled HTTP session used by all streams and the authenticator."""
+
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from tap_sharepointsites.throttling import Throttle
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP adapter with a default timeout, throttling and reuse counters."""
+
+    def __init__(self, timeout=None, throttle=None, **kwargs):
+        """Initialize the adapter."""
+        self.timeout = timeout
+        self.throttle = throttle
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        """Send a request, retrying throttled and transient failures."""
+        if timeout is None:
+            timeout = self.timeout
+        if self.throttle is None:
+            return super().send(request, timeout=timeout, **kwargs)
+
+        attempt = 0
+        # statuses of the attempts retried before the returned response
+        retried = []
+        while True:
+            self.throttle.acquire()
+            try:
+                response = super().send(request, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                response = None
+                delay = self.throttle.retry_delay(None, attempt)
+                if delay is None:
+                    raise
+            else:
+                delay = self.throttle.retry_delay(response, attempt)
+                if delay is None:
+                    response.retried_statuses = retried
+                    return response
+                response.close()
+
+            LOGGER.warning(
+                "Retrying %s in %.1f seconds (attempt %d, status %s)",
+                request.url.split("?")[0],
+                delay,
+                attempt + 1,
+                response.status_code if response is not None else "connection error",
+            )
+            retried.append(response.status_code if response is not None else None)
+            self.throttle.wait(response, delay)
+            attempt += 1
+
+    def connection_stats(self):
+        """Return request and connection counts for all live pools."""
+        stats = {"requests": 0, "connections": 0}
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+        return stats
+
+
+def cache_json(response, *args, **kwargs):
+    """Response hook making `response.json()` decode the body only once.
+
+    The paginator and the streams all call `response.json()` on the same
+    page; with this hook the body is decoded on the first call (with orjson
+    when it is installed) and the parsed object is returned afterwards.
+    """
+    decode = response.json
+    parsed = []
+
+    def json(**kwargs):
+        if not parsed:
+            if orjson is not None and not kwargs:
+                parsed.append(orjson.loads(response.content))
+            else:
+                parsed.append(decode(**kwargs))
+        return parsed[0]
+
+    response.json = json
+    return response
+
+
+def get_timeout(config):
+    """Return a (connect, read) timeout tuple from the tap config."""
+    return (
+        config.get("http_connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+        config.get("http_read_timeout", DEFAULT_READ_TIMEOUT),
+    )
+
+
+def build_session(config):
+    """Create a pooled session configured from the tap config."""
+    pool_size = config.get("http_pool_size", DEFAULT_POOL_SIZE)
+    adapter = PooledHTTPAdapter(
+        timeout=get_timeout(config),
+        throttle=Throttle.from_config(config),
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.hooks["response"].append(cache_json)
+
+    if not config.get("http_keep_alive", True):
+        session.headers["Connection"] = "close"
+
+    return session
+
+
+def build_auth_session(session):
+    """Create a session for token requests sharing the pooled adapters of `session`.
+
+    The SDK sets `auth` on the stream session to the Graph authenticator,
+    so token requests sent through it would ask for a token themselves.
+    This session has no `auth` and no hooks, only the connection pool.
+    """
+    auth_session = requests.Session()
+    for prefix, adapter in session.adapters.items():
+        auth_session.mount(prefix, adapter)
+    auth_session.headers.update(session.headers)
+    return auth_session
+
+
+def throttle_stats(session):
+    """Return the throttling metrics of a session's pooled adapter."""
+    adapter = session.get_adapter("https://")
+    if isinstance(adapter, PooledHTTPAdapter) and adapter.throttle is not None:
+        return dict(adapter.throttle.stats)
+    return {}
+
+
+def connection_stats(session):
+    """Sum the reuse counters over every pooled adapter of a session."""
+    stats = {"requests": 0, "connections": 0, "reused": 0}
+    adapters = {id(a): a for a in session.adapters.values()}
+    for adapter in adapters.values():
+        if isinstance(adapter, PooledHTTPAdapter):
+            for key, value in adapter.connection_stats().items():
+                stats[key] += value
+    return stats
@@ -1,15 +1,38 @@
 """sharepointsites tap class."""
+import copy
 import json
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from functools import cached_property
 from typing import List
 
 from singer_sdk import Stream, Tap
 from singer_sdk import typing as th  # JSON schema typing helpers
+from singer_sdk.singerlib import StateMessage
 
+from tap_sharepointsites.auth import CREDENTIAL_TYPES, CredentialCache
+from tap_sharepointsites.content_cache import ContentCache
 from tap_sharepointsites.file_stream import FilesStream
 from tap_sharepointsites.list_stream import ListStream
 from tap_sharepointsites.pages_stream import PagesStream
+from tap_sharepointsites.resolver import IdResolver
+from tap_sharepointsites.run_cache import RunCache
+from tap_sharepointsites.schema_cache import SchemaCache
+from tap_sharepointsites.session import (
+    build_auth_session,
+    build_session,
+    connection_stats,
+    throttle_stats,
+)
 from tap_sharepointsites.text_stream import TextStream
 
+# private singer-sdk members the concurrent sync relies on
+SDK_PRIVATE_API = (
+    "Tap._reset_state_progress_markers",
+    "Tap._set_compatible_replication_methods",
+    "Stream._tap_state",
+)
+
 
 class Tapsharepointsites(Tap):
     """sharepointsites tap class."""
@@ -30,6 +53,13 @@ class Tapsharepointsites(Tap):
             required=False,
             description="The name of the list to sync",
         ),
+        th.Property(
+            "list_delta_sync",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Sync lists incrementally using the Graph delta query",
+        ),
         th.Property(
             "files",
             th.ArrayType(
@@ -58,6 +88,12 @@ class Tapsharepointsites(Tap):
                         required=False,
                         description="For CSV files: the delimiter to use",
                     ),
+                    th.Property(
+                        "encoding",
+                        th.StringType,
+                        required=False,
+                        description="Text encoding of CSV files, detected if not set",
+                    ),
                     th.Property(
                         "clean_colnames",
                         th.BooleanType,
@@ -71,6 +107,13 @@ class Tapsharepointsites(Tap):
                         required=False,
                         description="Name of the excel sheet to load from",
                     ),
+                    th.Property(
+                        "excel_backend",
+                        th.StringType,
+                        required=False,
+                        allowed_values=["auto", "openpyxl", "xlrd", "calamine"],
+                        description="Library to read excel files with, chosen by file extension if not set",
+                    ),
                     th.Property(
                         "min_row",
                         th.IntegerType,
@@ -95,6 +138,68 @@ class Tapsharepointsites(Tap):
                         required=False,
                         description="Replace special characters and convert to snakecase",
                     ),
+                    th.Property(
+                        "parse_processes",
+                        th.IntegerType,
+                        required=False,
+                        default=0,
+                        description="Number of worker processes parsing files, 0 to parse in the tap process",
+                    ),
+                    th.Property(
+                        "prefetch_files",
+                        th.IntegerType,
+                        required=False,
+                        default=4,
+                        description="Number of files downloaded ahead while another is parsed, 0 to disable",
+                    ),
+                    th.Property(
+                        "prefetch_max_bytes",
+                        th.IntegerType,
+                        required=False,
+                        default=268435456,
+                        description="Max total size of files downloaded ahead",
+                    ),
+                    th.Property(
+                        "schema_sample_files",
+                        th.IntegerType,
+                        required=False,
+                        default=1,
+                        description="Number of matching files whose headers make up the schema",
+                    ),
+                    th.Property(
+                        "recursive",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Include files in subfolders, matching file_pattern against their path",
+                    ),
+                    th.Property(
+                        "delta_sync",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Find changed files through the drive delta query",
+                    ),
+                    th.Property(
+                        "server_filter",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Filter folder listings on name prefix and modified time server side",
+                    ),
+                    th.Property(
+                        "skip_unchanged",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Skip files whose content hash matches the one last synced",
+                    ),
+                    th.Property(
+                        "page_size",
+                        th.IntegerType,
+                        required=False,
+                        description="Number of items to request per page ($top)",
+                    ),
                 ),
             ),
             required=False,
@@ -122,6 +227,33 @@ class Tapsharepointsites(Tap):
                         required=True,
                         description="The folder to search",
                     ),
+                    th.Property(
+                        "recursive",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Include files in subfolders, matching file_pattern against their path",
+                    ),
+                    th.Property(
+                        "delta_sync",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Find changed files through the drive delta query",
+                    ),
+                    th.Property(
+                        "server_filter",
+                        th.BooleanType,
+                        required=False,
+                        default=False,
+                        description="Filter folder listings on name prefix and modified time server side",
+                    ),
+                    th.Property(
+                        "page_size",
+                        th.IntegerType,
+                        required=False,
+                        description="Number of items to request per page ($top)",
+                    ),
                 ),
             ),
             required=False,
@@ -139,8 +271,334 @@ class Tapsharepointsites(Tap):
             required=False,
             description="Managed Identity Client ID",
         ),
+        th.Property(
+            "credential_type",
+            th.StringType,
+            required=False,
+            allowed_values=list(CREDENTIAL_TYPES),
+            description="Azure credential to use, skipping the DefaultAzureCredential probe chain",
+        ),
+        th.Property(
+            "token_cache_path",
+            th.StringType,
+            required=False,
+            description="File to keep the encrypted access token in between runs",
+        ),
+        th.Property(
+            "token_cache_key",
+            th.StringType,
+            required=False,
+            secret=True,
+            description="Fernet key used to encrypt the token cache file",
+        ),
+        th.Property(
+            "token_refresh_skew",
+            th.IntegerType,
+            required=False,
+            default=300,
+            description="Seconds before expiry at which the access token is refreshed",
+        ),
+        th.Property(
+            "token_background_refresh",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Renew the access token in a background thread before it expires",
+        ),
+        th.Property(
+            "max_workers",
+            th.IntegerType,
+            required=False,
+            default=1,
+            description="Number of streams to sync in parallel",
+        ),
+        th.Property(
+            "page_size",
+            th.IntegerType,
+            required=False,
+            description="Number of items to request per page ($top) for all streams",
+        ),
+        th.Property(
+            "adaptive_page_size",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Grow or shrink the page size based on response times and throttling",
+        ),
+        th.Property(
+            "max_requests_per_second",
+            th.NumberType,
+            required=False,
+            description="Max requests per second across all streams, unlimited if not set",
+        ),
+        th.Property(
+            "max_retries",
+            th.IntegerType,
+            required=False,
+            default=5,
+            description="Retries of a throttled or failed request before giving up",
+        ),
+        th.Property(
+            "http_engine",
+            th.StringType,
+            required=False,
+            default="requests",
+            allowed_values=["requests", "async"],
+            description="Use `async` to fetch webparts, folder listings and text files concurrently with httpx",
+        ),
+        th.Property(
+            "async_max_concurrency",
+            th.IntegerType,
+            required=False,
+            default=50,
+            description="Max requests in flight with the async http engine",
+        ),
+        th.Property(
+            "http_pool_size",
+            th.IntegerType,
+            required=False,
+            default=10,
+            description="Max number of pooled connections per host",
+        ),
+        th.Property(
+            "http_keep_alive",
+            th.BooleanType,
+            required=False,
+            default=True,
+            description="Keep HTTP connections open for reuse between requests",
+        ),
+        th.Property(
+            "http_connect_timeout",
+            th.NumberType,
+            required=False,
+            default=10,
+            description="Seconds to wait for a connection to be established",
+        ),
+        th.Property(
+            "http_read_timeout",
+            th.NumberType,
+            required=False,
+            default=300,
+            description="Seconds to wait for the server to send data",
+        ),
+        th.Property(
+            "schema_cache_path",
+            th.StringType,
+            required=False,
+            description="File to keep discovered file schemas in between runs",
+        ),
+        th.Property(
+            "schema_cache_ttl",
+            th.IntegerType,
+            required=False,
+            description="Seconds a cached schema is used without checking whether the files changed",
+        ),
+        th.Property(
+            "run_cache",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Share folder listings and downloaded files between file streams during a run",
+        ),
+        th.Property(
+            "run_cache_max_bytes",
+            th.IntegerType,
+            required=False,
+            default=268435456,
+            description="Max bytes of downloaded files the run cache keeps in memory before spilling to disk",
+        ),
+        th.Property(
+            "run_cache_dir",
+            th.StringType,
+            required=False,
+            description="Directory the run cache spills files to, the system temp directory if not set",
+        ),
+        th.Property(
+            "content_cache_path",
+            th.StringType,
+            required=False,
+            description="Directory to keep downloaded files in between runs",
+        ),
+        th.Property(
+            "content_cache_max_bytes",
+            th.IntegerType,
+            required=False,
+            default=1073741824,
+            description="Max total size of the files in the content cache",
+        ),
+        th.Property(
+            "cache_ids_in_state",
+            th.BooleanType,
+            required=False,
+            default=False,
+            description="Keep resolved site, drive and list ids in state between runs",
+        ),
     ).to_dict()
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the tap."""
+        # Serializes Singer output when streams are synced concurrently
+        self._write_lock = threading.RLock()
+        self._concurrent_sync = False
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def http_session(self):
+        """Return the pooled HTTP session shared by all streams."""
+        return build_session(self.config)
+
+    @cached_property
+    def auth_session(self):
+        """Return the session token requests are sent with, without Graph auth."""
+        return build_auth_session(self.http_session)
+
+    @cached_property
+    def credentials(self):
+        """Return the Azure credentials of the tap, reused for every token refresh."""
+        return CredentialCache(self.auth_session)
+
+    def load_state(self, state: dict) -> None:
+        """Load bookmarks and any previously resolved ids from state."""
+        super().load_state(state)
+        if "resolved_ids" in state:
+            self.state["resolved_ids"] = state["resolved_ids"]
+
+    @cached_property
+    def id_resolver(self):
+        """Return the site/drive/list id cache shared by all streams."""
+        if self.config.get("cache_ids_in_state"):
+            return IdResolver(self.state.setdefault("resolved_ids", {}))
+        return IdResolver()
+
+    @cached_property
+    def schema_cache(self):
+        """Return the on-disk cache of file schemas, or None if not configured."""
+        return SchemaCache.from_config(self.config)
+
+    @cached_property
+    def content_cache(self):
+        """Return the on-disk cache of downloaded files, or None if not configured."""
+        return ContentCache.from_config(self.config)
+
+    @cached_property
+    def run_cache(self):
+        """Return the listing and download cache shared by file streams, or None."""
+        return RunCache.from_config(self.config)
+
+    def write_message(self, message) -> None:
+        """Write a Singer message, one at a time across all threads.
+
+        During a concurrent sync each stream keeps its bookmarks in a private
+        state dict. Its STATE messages are merged into the tap state here,
+        and the merged state is what gets written.
+        """
+        with self._write_lock:
+            if self._concurrent_sync and isinstance(message, StateMessage):
+                self._merge_stream_state(message.value)
+                # resolved ids in state are replaced, never changed, while copied
+                message = StateMessage(value=copy.deepcopy(self.state))
+            super().write_message(message)
+
+    def _merge_stream_state(self, stream_tap_state: dict) -> None:
+        """Copy the bookmarks of a stream's private state into the tap state."""
+        for name, bookmark in stream_tap_state.get("bookmarks", {}).items():
+            self.state.setdefault("bookmarks", {})[name] = copy.deepcopy(bookmark)
+
+    def _sync_all_concurrently(self, max_workers: int) -> None:
+        """Sync selected streams in a thread pool, like `Tap.sync_all`.
+
+        This mirrors `Tap.sync_all` of singer-sdk 0.46 and relies on its
+        private helpers listed in `SDK_PRIVATE_API`, which is why the SDK is
+        pinned to 0.46.x. Check them when upgrading the SDK.
+        """
+        self._reset_state_progress_markers()
+        self._set_compatible_replication_methods()
+        if self.state:
+            self.write_message(StateMessage(value=self.state))
+
+        # created before the workers start, as it may add resolved ids to state
+        self.id_resolver  # noqa: B018
+
+        streams = []
+        for stream in self.streams.values():
+            if not stream.selected and not stream.has_selected_descendents:
+                self.logger.info("Skipping deselected stream '%s'.", stream.name)
+                continue
+            if stream.parent_stream_type:
+                continue
+            # Streams only ever touch their own copy of their bookmark
+            stream._tap_state = {
+                "bookmarks": {stream.name: copy.deepcopy(stream.stream_state)}
+            }
+            streams.append(stream)
+
+        def sync_stream(stream):
+            stream.sync()
+            stream.finalize_state_progress_markers()
+
+        self._concurrent_sync = True
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(sync_stream, stream) for stream in streams]
+                done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in not_done:
+                    future.cancel()
+                for future in done:
+                    future.result()
+        finally:
+            self._concurrent_sync = False
+            with self._write_lock:
+                for stream in streams:
+                    self._merge_stream_state(stream.tap_state)
+                    stream._tap_state = self.state
+
+        self.write_message(StateMessage(value=self.state))
+
+        for stream in self.streams.values():
+            stream.log_sync_costs()
+
+    def sync_all(self) -> None:
+        """Sync all streams and report HTTP connection reuse."""
+        # every stream shares one authenticator
+        authenticator = None
+        if self.config.get("token_background_refresh") and self.streams:
+            authenticator = next(iter(self.streams.values())).authenticator
+            authenticator.start_background_refresh()
+
+        try:
+            max_workers = self.config.get("max_workers", 1)
+            if max_workers > 1:
+                self._sync_all_concurrently(max_workers)
+            else:
+                super().sync_all()
+        finally:
+            if authenticator is not None:
+                authenticator.stop_background_refresh()
+            for stream in self.streams.values():
+                stream.close_async_client()
+            if self.run_cache is not None:
+                self.run_cache.close()
+            if self.content_cache is not None:
+                self.content_cache.close()
+
+            stats = connection_stats(self.http_session)
+            self.logger.info(
+                "HTTP connection pool: %d requests over %d connections (%d reused)",
+                stats["requests"],
+                stats["connections"],
+                stats["reused"],
+            )
+            throttling = throttle_stats(self.http_session)
+            if throttling:
+                self.logger.info(
+                    "Throttling: %d retries, %d throttled responses, "
+                    "%.1fs waiting on the server, %.1fs rate limited",
+                    throttling["retries"],
+                    throttling["throttled_responses"],
+                    throttling["throttled_seconds"],
+                    throttling["rate_limited_seconds"],
+                )
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
         if self.config.get("lists"):
@@ -148,7 +606,7 @@ class Tapsharepointsites(Tap):
                 ListStream(
                     tap=self,
                     name=list_name,
-                    path=f"lists/{ list_name }/items?expand=fields",
+                    path=f"lists/{ list_name }/items",
                 )
                 for list_name in self.config["lists"]
             ]
@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tap_sharepointsites.async_client import AsyncGraphClient  # noqa: E402
+from tap_sharepointsites.session import throttle_stats  # noqa: E402
+from tap_sharepointsites.tap import Tapsharepointsites  # noqa: E402
+
+SAMPLE_CONFIG = {
+    "api_url": "https://graph.microsoft.com/v1.0/sites/m365x214355.sharepoint.com:/sites/SingerTests:/",  # noqa
+    "pages": True,
+    "http_engine": "async",
+}
+ROOT = "https://graph.microsoft.com/v1.0"
+
+
+@pytest.fixture
+def mock_az_default_identity():
+    with mock.patch(
+        "azure.identity.DefaultAzureCredential.get_token",
+    ) as mock_get_token:
+        mock_get_token.return_value = mock.Mock(
+            token="xy-123",
+            expires_on=int(
+                (datetime.now(timezone.utc) + timedelta(hours=1)).timestamp()
+            ),
+        )
+        yield mock_get_token
+
+
+def make_client(handler, max_concurrency=5):
+    tap = Tapsharepointsites(config=SAMPLE_CONFIG)
+    stream = tap.streams["pages"]
+    return AsyncGraphClient(stream, max_concurrency, httpx.MockTransport(handler))
+
+
+def test_async_client_enabled_by_config():
+    tap = Tapsharepointsites(config=SAMPLE_CONFIG)
+    assert isinstance(tap.streams["pages"].async_client, AsyncGraphClient)
+
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "http_engine": "requests"})
+    assert tap.streams["pages"].async_client is None
+
+
+def test_get_json_many_keeps_order(mock_az_default_identity):
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer xy-123"
+        return httpx.Response(200, json={"path": request.url.path})
+
+    urls = [f"{ROOT}/items/{i}" for i in range(12)]
+    bodies = make_client(handler).get_json_many(urls)
+
+    assert [body["path"] for body in bodies] == [f"/v1.0/items/{i}" for i in range(12)]
+
+
+def test_paginate_follows_next_links(mock_az_default_identity):
+    def handler(request):
+        if request.url.params.get("$skiptoken") == "2":
+            return httpx.Response(200, json={"value": [{"id": 3}]})
+        assert request.url.params["$top"] == "2"
+        return httpx.Response(
+            200,
+            json={
+                "value": [{"id": 1}, {"id": 2}],
+                "@odata.nextLink": f"{ROOT}/children?$skiptoken=2",
+            },
+        )
+
+    items = make_client(handler).paginate(f"{ROOT}/children", {"$top": 2})
+
+    assert [item["id"] for item in items] == [1, 2, 3]
+
+
+def test_paginate_yields_page_by_page(mock_az_default_identity):
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.params.get("$skiptoken"))
+        if request.url.params.get("$skiptoken") == "2":
+            return httpx.Response(200, json={"value": [{"id": 2}]})
+        return httpx.Response(
+            200,
+            json={
+                "value": [{"id": 1}],
+                "@odata.nextLink": f"{ROOT}/children?$skiptoken=2",
+            },
+        )
+
+    items = make_client(handler).paginate(f"{ROOT}/children")
+
+    assert next(items) == {"id": 1}
+    assert requested == [None]
+    assert list(items) == [{"id": 2}]
+    assert requested == [None, "2"]
+
+
+def test_client_kept_until_closed(mock_az_default_identity):
+    client = make_client(lambda request: httpx.Response(200, json={"value": []}))
+    with mock.patch.object(client, "_client", wraps=client._client) as new_client:
+        client.get_json_many([f"{ROOT}/items/1"])
+        client.download_many([f"{ROOT}/items/2"])
+        list(client.paginate(f"{ROOT}/children"))
+    http = client._http
+
+    assert new_client.call_count == 1
+    client.close()
+    assert http.is_closed
+    assert client._loop is None
+    client.close()
+
+
+def test_token_fetched_off_the_event_loop(mock_az_default_identity):
+    loops = []
+
+    def get_access_token():
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return "xy-123"
+
+    client = make_client(lambda request: httpx.Response(200, json={}))
+    with mock.patch.object(
+        client.stream.authenticator, "get_access_token", side_effect=get_access_token
+    ):
+        client.get_json_many([f"{ROOT}/items/1"])
+
+    assert loops == [None]
+
+
+def test_throttled_request_is_retried(mock_az_default_identity):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, content=b"file-bytes")
+
+    client = make_client(handler)
+    files = client.download_many([f"{ROOT}/file"])
+
+    assert files == [b"file-bytes"]
+    assert len(calls) == 2
+    assert throttle_stats(client.stream.requests_session)["throttled_responses"] == 1
+
+
+def test_failure_is_raised(mock_az_default_identity):
+    def handler(request):
+        return httpx.Response(404, json={"error": "not found"})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        make_client(handler).get_json_many([f"{ROOT}/missing"])
@@ -0,0 +1,188 @@
+import re
+import time
+from unittest import mock
+
+import pytest
+import responses
+from azure.core.credentials import AccessToken
+from cryptography.fernet import Fernet
+
+from tap_sharepointsites import auth
+from tap_sharepointsites.auth import CredentialCache, GraphAuthenticator
+from tap_sharepointsites.tap import Tapsharepointsites
+from tap_sharepointsites.token_cache import TokenCache
+
+SCOPE = "https://graph.microsoft.com/.default"
+SAMPLE_CONFIG = {
+    "api_url": "https://graph.microsoft.com/v1.0/sites/example.sharepoint.com:/sites/demo:/",  # noqa
+    "pages": True,
+}
+
+
+def make_authenticator(config=SAMPLE_CONFIG):
+    """Create an authenticator outside of the process-wide singleton."""
+    stream = Tapsharepointsites(config=config).streams["pages"]
+    authenticator = GraphAuthenticator.__new__(GraphAuthenticator)
+    authenticator.__init__(stream)
+    return authenticator
+
+
+def mock_get_token(lifetime):
+    return mock.patch(
+        "azure.identity.DefaultAzureCredential.get_token",
+        side_effect=lambda scope: AccessToken("xy-123", int(time.time()) + lifetime),
+    )
+
+
+def test_token_cache_persisted_encrypted(tmp_path):
+    path = tmp_path / "tokens.bin"
+    key = Fernet.generate_key()
+    token = AccessToken("xy-123", int(time.time()) + 3600)
+
+    TokenCache(str(path), key).put(SCOPE, "client", token)
+
+    assert b"xy-123" not in path.read_bytes()
+    cache = TokenCache(str(path), key)
+    assert cache.get(SCOPE, "client") == token
+    assert cache.get(SCOPE, "other-client") is None
+
+
+def test_token_cache_skips_expiring_tokens():
+    cache = TokenCache()
+    cache.put(SCOPE, None, AccessToken("xy-123", int(time.time()) + 60))
+    assert cache.get(SCOPE) is None
+
+
+def test_token_cache_ignores_other_key(tmp_path):
+    path = tmp_path / "tokens.bin"
+    token = AccessToken("xy-123", int(time.time()) + 3600)
+    TokenCache(str(path), Fernet.generate_key()).put(SCOPE, None, token)
+
+    assert TokenCache(str(path), Fernet.generate_key()).get(SCOPE) is None
+
+
+def test_token_cache_path_needs_key(tmp_path):
+    with pytest.raises(Exception, match="token_cache_key"):
+        TokenCache(str(tmp_path / "tokens.bin"))
+
+
+def test_credential_reused():
+    credentials = CredentialCache(mock.Mock())
+    first = credentials.get("environment", None)
+    assert credentials.get("environment", None) is first
+    assert credentials.get("managed_identity", "client") is not first
+
+    with pytest.raises(Exception, match="not supported"):
+        credentials.get("certificate", None)
+
+    # another tap gets its own credentials, bound to its own session
+    assert CredentialCache(mock.Mock()).get("environment", None) is not first
+
+
+def test_token_cache_keyed_by_identity():
+    cache = TokenCache()
+    token = AccessToken("xy-123", int(time.time()) + 3600)
+    cache.put(SCOPE, None, token, credential_type="environment", tenant_id="a")
+
+    assert cache.get(SCOPE, credential_type="environment", tenant_id="a") == token
+    assert cache.get(SCOPE, credential_type="environment", tenant_id="b") is None
+    assert cache.get(SCOPE, credential_type="azure_cli", tenant_id="a") is None
+
+
+def test_token_refreshed_before_expiry():
+    authenticator = make_authenticator()
+
+    with mock_get_token(3600) as get_token:
+        assert authenticator.get_access_token() == "xy-123"
+        authenticator.get_access_token()
+        assert get_token.call_count == 1
+        assert authenticator.is_token_valid()
+
+    with mock_get_token(100) as get_token:
+        authenticator.update_access_token(use_cache=False)
+        assert not authenticator.is_token_valid()
+        authenticator.get_access_token()
+        assert get_token.call_count == 2
+
+
+def test_background_refresh():
+    authenticator = make_authenticator()
+
+    with mock_get_token(3600) as get_token:
+        authenticator.start_background_refresh()
+        for _ in range(100):
+            if authenticator.access_token:
+                break
+            time.sleep(0.01)
+        authenticator.stop_background_refresh()
+
+    assert authenticator.access_token == "xy-123"
+    assert get_token.call_count == 1
+
+
+def test_background_refresh_delay():
+    authenticator = make_authenticator()
+    assert authenticator.background_refresh_delay() == 0
+
+    # refreshed 2 * skew before expiry
+    with mock_get_token(3600):
+        authenticator.update_access_token(use_cache=False)
+    assert authenticator.background_refresh_delay() == pytest.approx(3000, abs=2)
+
+    # inside the window: halfway to when requests refresh it
+    with mock_get_token(500):
+        authenticator.update_access_token(use_cache=False)
+    assert authenticator.background_refresh_delay() == pytest.approx(100, abs=2)
+
+    with mock_get_token(310):
+        authenticator.update_access_token(use_cache=False)
+    assert authenticator.background_refresh_delay() == auth.BACKGROUND_RETRY_SECONDS
+
+
+def test_background_refresh_backs_off():
+    authenticator = make_authenticator()
+    waits = []
+
+    def wait(seconds):
+        waits.append(seconds)
+        return len(waits) == 4
+
+    with mock.patch.object(
+        authenticator._stop_refresher, "wait", side_effect=wait
+    ), mock.patch(
+        "azure.identity.DefaultAzureCredential.get_token", side_effect=Exception("down")
+    ):
+        authenticator._refresh_loop()
+
+    assert waits == [30, 60, 120, 240]
+
+
+@responses.activate
+def test_login_through_authenticated_session(monkeypatch):
+    monkeypatch.setenv("AZURE_TENANT_ID", "tenant")
+    monkeypatch.setenv("AZURE_CLIENT_ID", "client")
+    monkeypatch.setenv("AZURE_CLIENT_SECRET", "secret")
+    login = "https://login.microsoftonline.com/tenant"
+    responses.add(
+        responses.GET,
+        re.compile(f"{login}/.*openid-configuration"),
+        json={
+            "token_endpoint": f"{login}/oauth2/v2.0/token",
+            "authorization_endpoint": f"{login}/oauth2/v2.0/authorize",
+            "issuer": f"{login}/v2.0",
+        },
+    )
+    responses.add(
+        responses.POST,
+        f"{login}/oauth2/v2.0/token",
+        json={"access_token": "xy-123", "expires_in": 3600, "token_type": "Bearer"},
+    )
+
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "credential_type": "environment"})
+    authenticator = GraphAuthenticator.__new__(GraphAuthenticator)
+    authenticator.__init__(tap.streams["pages"])
+    # the SDK authenticates every request of the stream session
+    tap.http_session.auth = authenticator
+
+    assert authenticator.get_access_token() == "xy-123"
+    assert all("Authorization" not in call.request.headers for call in responses.calls)
@@ -0,0 +1,94 @@
+import json
+from unittest import mock
+
+import pytest
+import responses
+from responses import POST
+
+from tap_sharepointsites.batch import GraphBatchClient, split_graph_url
+from tap_sharepointsites.tap import Tapsharepointsites
+
+SAMPLE_CONFIG = {
+    "api_url": "https://graph.microsoft.com/v1.0/sites/example.sharepoint.com:/sites/demo:/",  # noqa
+    "lists": ["list1"],
+}
+
+
+def test_split_graph_url():
+    assert split_graph_url(
+        "https://graph.microsoft.com/beta/sites/abc/pages?$top=5"
+    ) == ("https://graph.microsoft.com/beta", "/sites/abc/pages?$top=5")
+
+
+@responses.activate
+def test_batch_order_chunks_and_retries():
+    throttled_once = set()
+
+    def batch_callback(request):
+        subs = json.loads(request.body)["requests"]
+        assert len(subs) <= 20
+        results = []
+        # Answer in reverse order, throttling item 3 the first time around
+        for sub in reversed(subs):
+            number = sub["url"].rsplit("/", 1)[1]
+            if number == "3" and number not in throttled_once:
+                throttled_once.add(number)
+                results.append(
+                    {"id": sub["id"], "status": 429, "headers": {"Retry-After": "0"}}
+                )
+            else:
+                results.append({"id": sub["id"], "status": 200, "body": {"n": number}})
+        return (200, {}, json.dumps({"responses": results}))
+
+    responses.add_callback(
+        POST, "https://graph.microsoft.com/v1.0/$batch", callback=batch_callback
+    )
+
+    tap1 = Tapsharepointsites(config=SAMPLE_CONFIG)
+    stream = tap1.streams["list1"]
+    urls = [f"https://graph.microsoft.com/v1.0/items/{n}" for n in range(45)]
+
+    with mock.patch.object(type(stream), "authenticator", new=None):
+        bodies = GraphBatchClient(stream).get_json(urls)
+
+    assert [body["n"] for body in bodies] == [str(n) for n in range(45)]
+    # 3 batches for 45 urls, plus one for the throttled item
+    assert len(responses.calls) == 4
+
+
+@responses.activate
+def test_list_ids_resolved_per_list():
+    requested = []
+
+    def batch_callback(request):
+        results = []
+        for sub in json.loads(request.body)["requests"]:
+            requested.append(sub["url"])
+            if "/lists/missing" in sub["url"]:
+                results.append(
+                    {"id": sub["id"], "status": 404, "body": {"error": "nope"}}
+                )
+            else:
+                results.append(
+                    {"id": sub["id"], "status": 200, "body": {"id": "abc-123"}}
+                )
+        return (200, {}, json.dumps({"responses": results}))
+
+    responses.add_callback(
+        POST, "https://graph.microsoft.com/v1.0/$batch", callback=batch_callback
+    )
+
+    tap1 = Tapsharepointsites(config={**SAMPLE_CONFIG, "lists": ["Q&A #1?", "missing"]})
+    stream = tap1.streams["Q&A #1?"]
+    resolver = tap1.id_resolver
+
+    with mock.patch.object(type(stream), "authenticator", new=None):
+        # another list failing does not fail this one
+        assert resolver.list_id(stream, "Q&A #1?") == "abc-123"
+        with pytest.raises(Exception, match="Error getting list missing: 404"):
+            resolver.list_id(stream, "missing")
+
+    assert (
+        requested[0]
+        == "/sites/example.sharepoint.com:/sites/demo:/lists/Q%26A%20%231%3F?$select=id"
+    )
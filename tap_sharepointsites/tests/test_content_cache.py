@@ -0,0 +1,65 @@
+import os
+
+from tap_sharepointsites.content_cache import ContentCache, content_hash
+
+
+def item(id, quick_xor_hash=None, ctag=None):
+    record = {"id": id, "file": {"hashes": {}}}
+    if quick_xor_hash:
+        record["file"]["hashes"]["quickXorHash"] = quick_xor_hash
+    if ctag:
+        record["cTag"] = ctag
+    return record
+
+
+def test_content_hash():
+    assert content_hash(item("1", "qxh", "c1")) == "qxh"
+    assert content_hash(item("1", ctag="c1")) == "c1"
+    assert content_hash({"id": "1"}) is None
+
+
+def test_cache_kept_between_runs(tmp_path):
+    cache = ContentCache(str(tmp_path))
+    cache.put(item("1", "qxh"), b"a;b\n", "utf-8")
+    cache.close()
+
+    cache = ContentCache(str(tmp_path))
+    # the same bytes under another item and cTag
+    assert cache.get(item("2", "qxh", "c2")) == (b"a;b\n", "utf-8")
+    assert cache.get(item("1", "other")) is None
+    assert cache.get({"id": "3"}) is None
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = ContentCache(str(tmp_path), max_bytes=10)
+    cache.put(item("1", ctag="c1"), b"11111")
+    cache.put(item("2", ctag="c1"), b"22222")
+    cache.get(item("1", ctag="c1"))
+    cache.put(item("3", ctag="c1"), b"33333")
+
+    assert cache.get(item("2", ctag="c1")) is None
+    assert cache.get(item("1", ctag="c1")) == (b"11111", None)
+    assert cache.total_bytes == 10
+    assert len(os.listdir(tmp_path)) == 3
+
+    # files larger than the cache are not stored
+    cache.put(item("4", ctag="c1"), b"4" * 11)
+    assert cache.get(item("4", ctag="c1")) is None
+
+
+def test_downloaded_file_stored(tmp_path):
+    cache = ContentCache(str(tmp_path / "cache"), max_bytes=10)
+    downloaded = tmp_path / "download.csv"
+    downloaded.write_bytes(b"a;b\n")
+
+    cache.put_file(item("1", "qxh"), str(downloaded), "utf-8")
+    os.remove(downloaded)
+
+    file, charset = cache.open_file(item("2", "qxh"))
+    with file:
+        assert (file.read(), charset) == (b"a;b\n", "utf-8")
+
+    # files larger than the cache are not stored
+    downloaded.write_bytes(b"4" * 11)
+    cache.put_file(item("4", ctag="c1"), str(downloaded))
+    assert cache.open_file(item("4", ctag="c1")) is None
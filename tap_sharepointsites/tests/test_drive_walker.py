@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from tap_sharepointsites.drive_walker import (
+    DriveWalker,
+    listing_params,
+    literal_prefix,
+    source_name,
+)
+
+
+def folder(id, name, parent):
+    return {"id": id, "name": name, "folder": {}, "parentReference": {"id": parent}}
+
+
+def file(id, name, parent):
+    return {"id": id, "name": name, "file": {}, "parentReference": {"id": parent}}
+
+
+ROOT = {"id": "root", "name": "root", "root": {}, "folder": {}}
+
+
+def test_files_in_folder():
+    walker = DriveWalker({}, "Data/Raw", recursive=False)
+    items = [
+        ROOT,
+        folder("data", "Data", "root"),
+        folder("raw", "Raw", "data"),
+        folder("2024", "2024", "raw"),
+        file("a", "a.csv", "raw"),
+        file("b", "b.csv", "2024"),
+        file("c", "c.csv", "data"),
+    ]
+
+    assert [source_name(f) for f in walker.changed_files(items, True)] == ["a.csv"]
+
+
+def test_recursive_paths():
+    walker = DriveWalker({}, "data/raw", recursive=True)
+    items = [
+        ROOT,
+        folder("data", "Data", "root"),
+        folder("raw", "Raw", "data"),
+        folder("2024", "2024", "raw"),
+        file("a", "a.csv", "raw"),
+        file("b", "b.csv", "2024"),
+        file("c", "c.csv", "data"),
+    ]
+
+    files = walker.changed_files(items, True)
+    assert [source_name(f) for f in files] == ["a.csv", "2024/b.csv"]
+
+
+def test_file_before_its_folder():
+    walker = DriveWalker({}, None, recursive=True)
+
+    # the file comes on a page before its folder
+    assert list(walker.changed_files([ROOT, file("a", "a.csv", "sub")])) == []
+    files = walker.changed_files([folder("sub", "sub", "root")], last_page=True)
+    assert [source_name(f) for f in files] == ["sub/a.csv"]
+
+
+def test_folders_kept_between_runs():
+    folders = {}
+    walker = DriveWalker(folders, "data", recursive=True)
+    list(
+        walker.changed_files(
+            [ROOT, folder("data", "data", "root"), folder("x", "x", "data")], True
+        )
+    )
+
+    # a later feed only has the changed items, a renamed folder among them
+    walker = DriveWalker(folders, "data", recursive=True)
+    items = [
+        folder("x", "y", "data"),
+        file("a", "a.csv", "x"),
+        {"id": "b", "deleted": {}, "file": {}},
+    ]
+    assert [source_name(f) for f in walker.changed_files(items, True)] == ["y/a.csv"]
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix",
+    [
+        ("sample_.*\\.xlsx", "sample_"),
+        ("^report\\.csv", "report.csv"),
+        ("employees_\\d+\\.csv", "employees_"),
+        ("files?_.*", "file"),
+        ("a+b", "a"),
+        ("(sales|hr)_.*", ""),
+        (".*\\.csv", ""),
+    ],
+)
+def test_literal_prefix(pattern, prefix):
+    assert literal_prefix(pattern) == prefix
+
+
+def test_listing_params():
+    since = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    assert set(listing_params("o'neil_.*", since)) == {"$select"}
+
+    params = listing_params("o'neil_.*", since, server_filter=True)
+    assert params["$filter"] == (
+        "startswith(name,'o''neil_') and lastModifiedDateTime gt 2024-01-02T03:04:05Z"
+    )
+    assert params["$orderby"] == "lastModifiedDateTime"
+    assert "$filter" not in listing_params(".*", server_filter=True)
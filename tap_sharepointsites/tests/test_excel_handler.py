@@ -0,0 +1,141 @@
+import io
+from unittest import mock
+
+import openpyxl
+import pytest
+
+from tap_sharepointsites.file_handlers.excel_backends import (
+    CalamineBackend,
+    ExcelBackend,
+    OpenpyxlBackend,
+    XlrdBackend,
+    get_backend,
+)
+from tap_sharepointsites.file_handlers.excel_handler import ExcelHandler
+
+CONFIG_DIR = "tap_sharepointsites/tests/configuration"
+
+
+def read_rows(filename, backend, **bounds):
+    with open(f"{CONFIG_DIR}/{filename}", "rb") as file:
+        content = file.read()
+    handler = ExcelHandler(
+        content,
+        "Sheet1",
+        bounds.get("min_row"),
+        bounds.get("max_row"),
+        bounds.get("min_col"),
+        bounds.get("max_col"),
+        filename=filename,
+        backend=backend,
+    )
+    return handler.fieldnames, list(handler.get_row_iterator())
+
+
+@pytest.mark.parametrize(
+    "bounds",
+    [{}, {"min_row": 3, "min_col": 3}, {"min_row": 3, "min_col": 4, "max_col": 5}],
+)
+def test_xlsx_backends_agree(bounds):
+    if not CalamineBackend.is_available():
+        pytest.skip("python-calamine is not installed")
+
+    # the sheet starts at C3, with dates, datetimes and times
+    expected = read_rows("sample_excel_offset.xlsx", "openpyxl", **bounds)
+
+    assert read_rows("sample_excel_offset.xlsx", "calamine", **bounds) == expected
+
+
+def test_xlsx_offset_and_dates():
+    fieldnames, rows = read_rows(
+        "sample_excel_offset.xlsx", "openpyxl", min_row=3, min_col=3
+    )
+
+    assert fieldnames == ["Name", "Day", "At", "Amount"]
+    assert rows[0] == {
+        "Name": "a",
+        "Day": "2024-01-02 00:00:00",
+        "At": "2024-01-02 03:04:05",
+        "Amount": "1.5",
+    }
+    assert rows[1]["Amount"] == "2"
+
+
+@pytest.mark.parametrize("backend", ["xlrd", "calamine"])
+def test_xls_backends_agree(backend):
+    if backend == "calamine" and not CalamineBackend.is_available():
+        pytest.skip("python-calamine is not installed")
+
+    fieldnames, rows = read_rows("sample_excel.xls", backend)
+
+    assert fieldnames == [
+        "ID Column",
+        "First Name",
+        "Last Name",
+        "Best (invisible) color",
+    ]
+    assert rows[0] == {
+        "ID Column": "1",
+        "First Name": "Tuppen",
+        "Last Name": None,
+        "Best (invisible) color": "Infrarød",
+    }
+    assert rows[2]["Best (invisible) color"] == "2024-01-02 03:04:05"
+
+
+def test_row_and_column_bounds():
+    fieldnames, rows = read_rows(
+        "sample_excel.xls", "xlrd", min_row=2, max_row=3, min_col=2, max_col=3
+    )
+
+    assert fieldnames == ["Tuppen", "untitled_1"]
+    assert rows == [{"Tuppen": "Pippi", "untitled_1": "Langstrømpe"}]
+
+
+def test_backend_by_extension():
+    assert get_backend("report.xls") is XlrdBackend
+    assert get_backend("report.xlsx") is OpenpyxlBackend
+    assert get_backend("report.xlsx", "openpyxl") is OpenpyxlBackend
+    assert get_backend("report.xls", "xlrd") is XlrdBackend
+
+    with pytest.raises(Exception, match="not supported"):
+        get_backend("report.xlsx", "pandas")
+
+
+def test_backend_must_implement_reading():
+    class NoRows(ExcelBackend):
+        def __init__(self, content):
+            self.content = content
+
+    with pytest.raises(TypeError):
+        NoRows(b"")
+
+
+def test_xlsx_rows_streamed_from_memory():
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Sheet1"
+    sheet.append(["id", "name"])
+    for i in range(1, 1001):
+        # every tenth row is left empty
+        sheet.append([] if i % 10 == 0 else [i, f"name {i}"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    with mock.patch(
+        "tempfile.NamedTemporaryFile", side_effect=AssertionError("temp file")
+    ):
+        handler = ExcelHandler(
+            buffer, "Sheet1", None, None, None, None, filename="a.xlsx"
+        )
+        rows = handler.get_value_rows()
+
+        # rows come from a read-only workbook, one value tuple at a time
+        assert handler.workbook.workbook.read_only
+        assert next(rows) == ("1", "name 1")
+        remaining = list(rows)
+
+    assert handler.fieldnames == ["id", "name"]
+    assert len(remaining) == 899
+    assert ("10", "name 10") not in remaining
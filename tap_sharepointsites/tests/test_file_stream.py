@@ -1,12 +1,29 @@
 import json
 import logging
+import os
 import re
 from unittest import mock
 
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 import responses
 from responses import GET
 
+from charset_normalizer import from_bytes
+
+from tap_sharepointsites.drive_walker import SELECT_FIELDS
+from tap_sharepointsites.file_handlers.csv_handler import (
+    DETECT_BYTES,
+    CSVHandler,
+    iter_decoded_lines,
+    iter_text_lines,
+    sniff_encoding,
+)
+from tap_sharepointsites.file_handlers.excel_handler import ExcelHandler
+from tap_sharepointsites.file_handlers.range_file import HTTPRangeFile
+from tap_sharepointsites.row_builder import RowBuilder
 from tap_sharepointsites.tap import Tapsharepointsites
 from datetime import datetime, timedelta, timezone
 
@@ -209,3 +226,721 @@ def test_basic_read():
         data = file.read()
 
     assert "Langstrømpe" in data
+
+
+def test_streamed_csv_lines():
+    data = 'id;name\r\n1;"Lang\nstrømpe"\r\n2;Åberg\r\n'.encode("utf-8")
+    # split inside multi-byte characters and between \r and \n
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+
+    lines = list(iter_decoded_lines(chunks))
+    assert "".join(lines) == data.decode("utf-8")
+
+    rows = list(CSVHandler(iter_decoded_lines(chunks), ";").get_dictreader())
+    assert rows == [
+        {"id": "1", "name": "Lang\nstrømpe"},
+        {"id": "2", "name": "Åberg"},
+    ]
+
+
+def range_callback(content):
+    """Return a responses callback serving `content` with Range support."""
+
+    def callback(request):
+        if "Range" not in request.headers:
+            return (200, {}, content)
+        start, end = request.headers["Range"].split("=")[1].split("-")
+        body = content[int(start):int(end) + 1]
+        return (206, {"Content-Range": f"bytes {start}-{end}/{len(content)}"}, body)
+
+    return callback
+
+
+@responses.activate
+def test_schema_union_from_csv_headers(mock_az_default_identity):
+    files = []
+    for i, csv_data in enumerate([b"id;name\n1;a\n", b"id;color;size\n2;red;3\n" * 5000]):
+        url = f"https://example.sharepoint.com/download.aspx?UniqueId={i}"
+        responses.add_callback(GET, url, callback=range_callback(csv_data))
+        files.append(
+            {
+                "name": f"sample_{i}.csv",
+                "size": len(csv_data),
+                "@microsoft.graph.downloadUrl": url,
+                "file": {},
+            }
+        )
+
+    config = {
+        **SAMPLE_CONFIG,
+        "files": [
+            {
+                "name": "file1",
+                "file_pattern": "sample_.*\\.csv",
+                "file_type": "csv",
+                "delimiter": ";",
+                "schema_sample_files": 2,
+            }
+        ],
+    }
+    with mock.patch(
+        "tap_sharepointsites.file_stream.FilesStream.list_all_files",
+        return_value=iter(files),
+    ):
+        stream = Tapsharepointsites(config=config).streams["file1"]
+        properties = list(stream.schema["properties"])
+
+    assert properties[:4] == ["id", "name", "color", "size"]
+    assert all(call.request.headers["Range"] == "bytes=0-16383" for call in responses.calls)
+
+
+@responses.activate
+def test_excel_header_from_ranges():
+    with open("tap_sharepointsites/tests/configuration/sample_excel.xlsx", "rb") as file:
+        content = file.read()
+    url = "https://example.sharepoint.com/download.aspx?UniqueId=excel"
+    responses.add_callback(GET, url, callback=range_callback(content))
+
+    session = requests.Session()
+    buffer = HTTPRangeFile.open(session, url, len(content), buffer_size=1024)
+    handler = ExcelHandler(buffer, "Sheet1", None, None, None, None, backend="openpyxl")
+
+    assert handler.fieldnames == ["ID Column", "First Name", "Last Name", "Best (invisible) color"]
+    assert all("Range" in call.request.headers for call in responses.calls)
+
+
+@pytest.mark.parametrize("backend", ["openpyxl", "calamine"])
+@responses.activate
+def test_excel_schema_matches_records(mock_az_default_identity, backend):
+    if backend == "calamine":
+        pytest.importorskip("python_calamine")
+    with open("tap_sharepointsites/tests/configuration/sample_excel_offset.xlsx", "rb") as file:
+        content = file.read()
+    url = "https://example.sharepoint.com/download.aspx?UniqueId=excel"
+    responses.add_callback(GET, url, callback=range_callback(content))
+    files = [
+        {
+            "name": f"sample_{i}.xlsx",
+            "size": len(content),
+            "lastModifiedDateTime": "2024-01-01T00:00:00Z",
+            "@microsoft.graph.downloadUrl": url,
+            "file": {},
+        }
+        for i in range(3)
+    ]
+
+    file_config = {
+        "name": "file1",
+        "file_pattern": "sample_.*\\.xlsx",
+        "file_type": "excel",
+        "excel_backend": backend,
+        "min_row": 3,
+        "schema_sample_files": 3,
+        "prefetch_files": 2,
+    }
+    with mock.patch(
+        "tap_sharepointsites.file_stream.FilesStream.list_all_files",
+        return_value=iter(files),
+    ), mock.patch(
+        "tap_sharepointsites.file_stream.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+    ) as executor:
+        stream = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]}).streams["file1"]
+        properties = list(stream.schema["properties"])
+
+    # header reads are limited like prefetched downloads
+    assert executor.call_args.kwargs["max_workers"] == 2
+    # calamine reads whole files, only openpyxl reads through ranges
+    assert any("Range" in call.request.headers for call in responses.calls) == (
+        backend == "openpyxl"
+    )
+
+    records = list(stream.parse_items(files[:1]))
+    assert list(records[0]) == properties
+
+
+@responses.activate
+def test_schema_cache(mock_az_default_identity, tmp_path):
+    url = "https://example.sharepoint.com/download.aspx?UniqueId=1"
+    responses.add_callback(GET, url, callback=range_callback(b"id;name\n1;a\n"))
+    files = [
+        {
+            "id": "1",
+            "cTag": '"c:{1},1"',
+            "name": "sample_1.csv",
+            "@microsoft.graph.downloadUrl": url,
+            "file": {},
+        }
+    ]
+
+    config = {
+        **SAMPLE_CONFIG,
+        "schema_cache_path": str(tmp_path / "schemas.json"),
+        "files": [
+            {
+                "name": "file1",
+                "file_pattern": "sample_.*\\.csv",
+                "file_type": "csv",
+                "delimiter": ";",
+            }
+        ],
+    }
+
+    def discover(config, files):
+        with mock.patch(
+            "tap_sharepointsites.file_stream.FilesStream.list_all_files",
+            return_value=iter(files),
+        ) as list_all_files:
+            stream = Tapsharepointsites(config=config).streams["file1"]
+            return list(stream.schema["properties"])[:2], list_all_files.call_count
+
+    assert discover(config, files) == (["id", "name"], 1)
+    assert len(responses.calls) == 1
+
+    # unchanged files are listed but not downloaded again
+    assert discover(config, files) == (["id", "name"], 1)
+    assert len(responses.calls) == 1
+
+    # within the ttl the folder is not listed either
+    assert discover({**config, "schema_cache_ttl": 60}, files) == (["id", "name"], 0)
+
+    # a changed file is downloaded again
+    changed = [{**files[0], "cTag": '"c:{1},2"'}]
+    discover(config, changed)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_expired_download_url_refreshed(mock_az_default_identity):
+    expired = "https://example.sharepoint.com/download.aspx?tempauth=old"
+    fresh = "https://example.sharepoint.com/download.aspx?tempauth=new"
+    responses.add(GET, expired, status=401)
+    responses.add(GET, fresh, body=b"id;name\n1;a\n")
+    responses.add(
+        GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response()
+    )
+    responses.add(
+        GET,
+        "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/items/file-1",
+        json={"id": "file-1", "@microsoft.graph.downloadUrl": fresh},
+    )
+
+    config = {
+        **SAMPLE_CONFIG,
+        "files": [{"name": "file1", "file_pattern": "x", "file_type": "csv"}],
+    }
+    with mock.patch(
+        "tap_sharepointsites.file_stream.FilesStream.schema", new_callable=mock.PropertyMock
+    ) as schema:
+        schema.return_value = {"type": "object", "properties": {}}
+        stream = Tapsharepointsites(config=config).streams["file1"]
+
+    record = {"id": "file-1", "name": "sample.csv", "@microsoft.graph.downloadUrl": expired}
+    buffer, encoding = stream.download_file(record)
+
+    assert buffer.read() == b"id;name\n1;a\n"
+    assert record["@microsoft.graph.downloadUrl"] == fresh
+
+
+@pytest.mark.parametrize("filetype, filename", [("csv", "sample.csv"), ("excel", "sample_excel.xlsx")])
+@responses.activate
+def test_parse_in_processes(mock_az_default_identity, capsys, filetype, filename):
+    responses.add_callback(
+        responses.GET,
+        re.compile(
+            r"https://m365x214355\.sharepoint\.com/sites/SingerTests/_layouts/15/download\.aspx\?UniqueId=[^&]+"
+        ),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    responses.add(
+        GET,
+        "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root:/sample_folder:/children",
+        json=list_files_response(),
+    )
+
+    def sync(processes):
+        file_config = {
+            **SAMPLE_CONFIG["files"][0],
+            "file_type": filetype,
+            "file_pattern": filename,
+            "parse_processes": processes,
+        }
+        tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]})
+        tap.streams["file1"].sync(None)
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        records = [message["record"] for message in messages if message["type"] == "RECORD"]
+        for record in records:
+            record.pop("_sdc_loaded_at")
+        return records
+
+    in_process = sync(0)
+    assert len(in_process) == 5
+    assert sync(2) == in_process
+
+
+@responses.activate
+def test_parse_in_processes_stopped_early(mock_az_default_identity, tmp_path):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    responses.add(
+        GET,
+        "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root:/sample_folder:/children",
+        json=list_files_response(),
+    )
+    file_config = {
+        **SAMPLE_CONFIG["files"][0],
+        "file_pattern": "sample\\.csv",
+        "file_type": "csv",
+        "delimiter": ",",
+    }
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]})
+    stream = tap.streams["file1"]
+    records = [{"id": str(i), "name": f"{i}.csv", "size": 8} for i in range(6)]
+
+    def download_to_file(record):
+        path = tmp_path / record["name"]
+        path.write_bytes(b"a,b\n1,2\n")
+        return str(path), "utf-8"
+
+    with mock.patch.object(stream, "download_to_file", download_to_file):
+        files = stream.parse_files_in_processes(records, 2)
+        record, fieldnames, rows = next(files)
+        assert (record["id"], fieldnames) == ("0", ["a", "b"])
+        # stop before reading any rows
+        files.close()
+
+    # downloads, queued downloads and parsed rows are all removed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_row_builder():
+    record = {"name": "sample.csv", "lastModifiedDateTime": "2024-01-01T00:00:00Z"}
+    builder = RowBuilder(["ID Column", "First Name"], record)
+
+    rows = list(builder.build_all([["1", "Pippi"], ["2"], ["3", "Albert", "x"]]))
+
+    assert list(rows[0]) == [
+        "id_column",
+        "first_name",
+        "_sdc_source_file",
+        "_sdc_row_num",
+        "_sdc_loaded_at",
+        "lastModifiedDateTime",
+    ]
+    assert rows[0]["first_name"] == "Pippi"
+    assert rows[1]["first_name"] is None
+    assert rows[2]["_sdc_extra"] == ["x"]
+    assert [row["_sdc_row_num"] for row in rows] == [0, 1, 2]
+
+
+@pytest.mark.parametrize(
+    "data, encoding, charset, expected",
+    [
+        ("id,navn\n1,Åberg\n".encode("utf-8-sig"), None, None, "utf-8-sig"),
+        ("id,navn\n1,Åberg\n".encode("utf-16"), "cp1252", None, "utf-16"),
+        ("id,navn\n1,Åberg\n".encode("utf-8"), None, None, "utf-8"),
+        ("id,navn\n1,Åberg\n".encode("cp1252"), "cp1252", None, "cp1252"),
+        ("id,navn\n1,Åberg\n".encode("latin-1"), None, "iso-8859-1", "iso-8859-1"),
+    ],
+)
+def test_sniff_encoding(data, encoding, charset, expected):
+    assert sniff_encoding(data, encoding, charset) == expected
+
+    lines = list(iter_text_lines([data[i:i + 5] for i in range(0, len(data), 5)], encoding, charset))
+    assert lines == ["id,navn\n", "1,Åberg\n"]
+
+
+def test_detect_encoding_on_prefix():
+    data = ("id;navn\n" + "1;Langstrømpe Åberg æøå\n" * 10000).encode("cp1252")
+
+    with mock.patch(
+        "tap_sharepointsites.file_handlers.csv_handler.from_bytes",
+        wraps=from_bytes,
+    ) as detect:
+        lines = list(iter_text_lines([data]))
+
+    assert len(detect.call_args.args[0]) == DETECT_BYTES
+    assert len(lines) == 10001
+
+
+@responses.activate
+def test_header_decoded_with_response_charset(mock_az_default_identity):
+    # valid UTF-8, but the server declares latin-1
+    content = "størrelse;id\n3;1\n".encode("utf-8")
+    url = "https://example.sharepoint.com/download.aspx?UniqueId=1"
+    serve = range_callback(content)
+
+    def callback(request):
+        status, headers, body = serve(request)
+        return status, {**headers, "Content-Type": "text/csv; charset=iso-8859-1"}, body
+
+    responses.add_callback(GET, url, callback=callback)
+    files = [
+        {
+            "name": "sample_1.csv",
+            "lastModifiedDateTime": "2024-01-01T00:00:00Z",
+            "@microsoft.graph.downloadUrl": url,
+            "file": {},
+        }
+    ]
+
+    file_config = {
+        "name": "file1",
+        "file_pattern": "sample_.*\\.csv",
+        "file_type": "csv",
+        "delimiter": ";",
+        "clean_colnames": False,
+    }
+    with mock.patch(
+        "tap_sharepointsites.file_stream.FilesStream.list_all_files",
+        return_value=iter(files),
+    ):
+        stream = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]}).streams["file1"]
+        properties = list(stream.schema["properties"])
+
+    records = list(stream.parse_items(files))
+    assert properties[0] == "stÃ¸rrelse"
+    assert list(records[0]) == properties
+
+
+@responses.activate
+def test_delta_sync(mock_az_default_identity, capsys):
+    delta_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root/delta"
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+
+    def item(id, name, parent, **kwargs):
+        return {"id": id, "name": name, "parentReference": {"id": parent}, **kwargs}
+
+    def csv_file(id, name, parent):
+        url = f"https://m365x214355.sharepoint.com/_layouts/15/download.aspx?UniqueId={id}"
+        return item(
+            id,
+            name,
+            parent,
+            file={},
+            lastModifiedDateTime="2024-01-01T00:00:00Z",
+            **{"@microsoft.graph.downloadUrl": url},
+        )
+
+    responses.add(
+        GET,
+        delta_url,
+        match=[responses.matchers.query_param_matcher({"$select": SELECT_FIELDS})],
+        json={
+            "value": [
+                {"id": "root", "name": "root", "root": {}, "folder": {}},
+                item("folder", "sample_folder", "root", folder={}),
+                csv_file("outside", "sample.csv", "root"),
+            ],
+            "@odata.nextLink": f"{delta_url}?token=page2",
+        },
+    )
+    responses.add(
+        GET,
+        delta_url,
+        match=[responses.matchers.query_param_matcher({"token": "page2"})],
+        json={
+            "value": [
+                item("sub", "2024", "folder", folder={}),
+                csv_file("inside", "sample.csv", "sub"),
+            ],
+            "@odata.deltaLink": f"{delta_url}?token=latest",
+        },
+    )
+    responses.add(
+        GET,
+        delta_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"$select": SELECT_FIELDS, "token": "latest"}
+            )
+        ],
+        json={"value": [], "@odata.deltaLink": f"{delta_url}?token=next"},
+    )
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "_sdc_source_file": {"type": "string"},
+            "lastModifiedDateTime": {"type": "string", "format": "date-time"},
+        },
+    }
+    file_config = {
+        **SAMPLE_CONFIG["files"][0],
+        "file_type": "csv",
+        "file_pattern": r"2024/sample.*\.csv",
+        "delimiter": ",",
+        "recursive": True,
+        "delta_sync": True,
+    }
+    with mock.patch(
+        "tap_sharepointsites.file_stream.FilesStream.schema", new_callable=mock.PropertyMock
+    ) as mocked:
+        mocked.return_value = schema
+        tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]})
+        stream = tap.streams["file1"]
+        stream.sync(None)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [message["record"] for message in messages if message["type"] == "RECORD"]
+    assert len(records) == 5
+    assert {record["_sdc_source_file"] for record in records} == {"2024/sample.csv"}
+    assert stream.stream_state["delta_link"] == f"{delta_url}?token=latest"
+    assert stream.stream_state["folders"]["sub"] == ["2024", "folder"]
+
+    # the next run starts from the delta link
+    with mock.patch(
+        "tap_sharepointsites.file_stream.FilesStream.schema", new_callable=mock.PropertyMock
+    ) as mocked:
+        mocked.return_value = schema
+        tap = Tapsharepointsites(
+            config={**SAMPLE_CONFIG, "files": [file_config]}, state=tap.state
+        )
+        stream = tap.streams["file1"]
+        stream.sync(None)
+
+    assert stream.stream_state["delta_link"] == f"{delta_url}?token=next"
+
+
+@responses.activate
+def test_server_side_filter(mock_az_default_identity, capsys):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    children_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root:/sample_folder:/children"
+    # schema discovery only filters on the name
+    responses.add(
+        GET,
+        children_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"$select": SELECT_FIELDS, "$filter": "startswith(name,'sample_')"}
+            )
+        ],
+        json=list_files_response(),
+    )
+    responses.add(
+        GET,
+        children_url,
+        match=[
+            responses.matchers.query_param_matcher(
+                {
+                    "$select": SELECT_FIELDS,
+                    "$filter": "startswith(name,'sample_') "
+                    "and lastModifiedDateTime gt 2023-01-01T00:00:00Z",
+                    "$orderby": "lastModifiedDateTime",
+                }
+            )
+        ],
+        json=list_files_response(),
+    )
+
+    file_config = {
+        **SAMPLE_CONFIG["files"][0],
+        "file_pattern": "sample_.*\\.xlsx",
+        "file_type": "excel",
+        "server_filter": True,
+    }
+    state = {
+        "bookmarks": {
+            "file1": {
+                "replication_key": "lastModifiedDateTime",
+                "replication_key_value": "2023-01-01T00:00:00+00:00",
+            }
+        }
+    }
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]}, state=state)
+    tap.streams["file1"].sync(None)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len([message for message in messages if message["type"] == "RECORD"]) == 5
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"parse_processes": 2}, {"prefetch_max_bytes": 1}],
+    ids=["in_memory", "processes", "streamed"],
+)
+@responses.activate
+def test_run_cache_shared_between_streams(mock_az_default_identity, capsys, options):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    children_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root:/sample_folder:/children"
+    responses.add(GET, children_url, json=list_files_response())
+
+    files = [
+        {
+            "name": name,
+            "file_pattern": "sample\\.csv",
+            "file_type": "csv",
+            "folder": "sample_folder",
+            "delimiter": ",",
+            **options,
+        }
+        for name in ("file1", "file2")
+    ]
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": files, "run_cache": True})
+    tap.sync_all()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len([message for message in messages if message["type"] == "RECORD"]) == 10
+
+    listings = [call for call in responses.calls if call.request.url.startswith(children_url)]
+    downloads = [
+        call
+        for call in responses.calls
+        if "download.aspx" in call.request.url and "Range" not in call.request.headers
+    ]
+    assert len(listings) == 1
+    assert len(downloads) == 1
+    assert not os.path.exists(tap.run_cache.spill_dir)
+
+
+@responses.activate
+def test_unchanged_content(mock_az_default_identity, capsys, tmp_path):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    children_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root:/sample_folder:/children"
+    listing = list_files_response()
+    responses.add(GET, children_url, json=listing)
+
+    file_config = {
+        **SAMPLE_CONFIG["files"][0],
+        "file_pattern": "sample\\.csv",
+        "file_type": "csv",
+        "delimiter": ",",
+    }
+    config = {
+        **SAMPLE_CONFIG,
+        "files": [file_config],
+        "content_cache_path": str(tmp_path / "content"),
+    }
+
+    def sync(config, state):
+        tap = Tapsharepointsites(config=config, state=state)
+        tap.sync_all()
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        records = [message for message in messages if message["type"] == "RECORD"]
+        return len(records), tap.state
+
+    def downloads():
+        # full downloads, not the header read for the schema
+        return len(
+            [
+                call
+                for call in responses.calls
+                if "download.aspx" in call.request.url and "Range" not in call.request.headers
+            ]
+        )
+
+    skipping = {**config, "files": [{**file_config, "skip_unchanged": True}]}
+    count, state = sync(skipping, {})
+    assert count == 5
+    assert downloads() == 1
+
+    # only the metadata of the file changes
+    for file in listing["value"]:
+        file["lastModifiedDateTime"] = "2030-01-01T00:00:00Z"
+    responses.replace(GET, children_url, json=listing)
+
+    # the file is skipped, as its hash was synced
+    assert sync(skipping, state)[0] == 0
+
+    # or emitted again from the content cache
+    assert sync(config, state)[0] == 5
+    assert downloads() == 1
+
+    # the hash of a file removed from the folder is forgotten
+    synced = state["bookmarks"]["file1"]["content_hashes"]
+    synced["removed"] = "qxh"
+    state = sync(skipping, state)[1]
+    assert set(state["bookmarks"]["file1"]["content_hashes"]) == set(synced) - {"removed"}
+
+
+@responses.activate
+def test_prefetched_files_read_from_disk(mock_az_default_identity, capsys):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    children_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890/root:/sample_folder:/children"
+    responses.add(GET, children_url, json=list_files_response())
+
+    file_config = {
+        **SAMPLE_CONFIG["files"][0],
+        "file_pattern": "sample\\.csv",
+        "file_type": "csv",
+        "delimiter": ",",
+    }
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]})
+    stream = tap.streams["file1"]
+    paths = []
+    download_to_file = stream.download_to_file
+
+    def recording_download(row_data):
+        paths.append(download_to_file(row_data)[0])
+        return paths[-1], None
+
+    with mock.patch.object(stream, "download_to_file", recording_download), mock.patch.object(
+        stream, "download_file", side_effect=AssertionError("buffered in memory")
+    ):
+        stream.sync(None)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len([message for message in messages if message["type"] == "RECORD"]) == 5
+    assert len(paths) == 1
+    assert not os.path.exists(paths[0])
+
+
+@responses.activate
+def test_recursive_sync(mock_az_default_identity, capsys):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    drive_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890"
+    responses.add(
+        GET,
+        f"{drive_url}/root:/sample_folder:/children",
+        json={"value": [{"id": "sub-id", "name": "sub", "folder": {}}]},
+    )
+    responses.add(GET, f"{drive_url}/items/sub-id/children", json=list_files_response())
+
+    file_config = {
+        **SAMPLE_CONFIG["files"][0],
+        "file_pattern": "sub/sample\\.csv",
+        "file_type": "csv",
+        "delimiter": ",",
+        "recursive": True,
+    }
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "files": [file_config]})
+    tap.streams["file1"].sync(None)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [message["record"] for message in messages if message["type"] == "RECORD"]
+    assert len(records) == 5
+    assert {record["_sdc_source_file"] for record in records} == {"sub/sample.csv"}
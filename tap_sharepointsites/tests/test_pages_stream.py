@@ -5,7 +5,7 @@ from unittest import mock
 
 import pytest
 import responses
-from responses import GET
+from responses import GET, POST
 
 from tap_sharepointsites.tap import Tapsharepointsites
 
@@ -70,18 +70,26 @@ def test_pages(mock_az_default_identity, capsys):
         status=200,
     )
 
-    responses.add(
-        GET,
-        "https://graph.microsoft.com/beta/sites/m365x214355.sharepoint.com,5a58bb09-1fba-41c1-8125-69da264370a0,9f2ec1da-0be4-4a74-9254-973f0add78fd/pages/111-bfsv-bfdv-bfdsb-bvfedabgtf/microsoft.graph.sitepage/webparts",  # noqa
-        json=mock_page1_response(),
-        status=200,
-    )
-
-    responses.add(
-        GET,
-        "https://graph.microsoft.com/beta/sites/m365x214355.sharepoint.com,5a58bb09-1fba-41c1-8125-69da264370a0,9f2ec1da-0be4-4a74-9254-973f0add78fd/pages/222-bfsv-bfdv-bfdsb-bvfedabgtf/microsoft.graph.sitepage/webparts",  # noqa
-        json=mock_page2_response(),
-        status=200,
+    site_path = "/sites/m365x214355.sharepoint.com,5a58bb09-1fba-41c1-8125-69da264370a0,9f2ec1da-0be4-4a74-9254-973f0add78fd"  # noqa
+    webparts = {
+        f"{site_path}/pages/111-bfsv-bfdv-bfdsb-bvfedabgtf/microsoft.graph.sitepage/webparts": mock_page1_response(),  # noqa
+        f"{site_path}/pages/222-bfsv-bfdv-bfdsb-bvfedabgtf/microsoft.graph.sitepage/webparts": mock_page2_response(),  # noqa
+    }
+
+    def batch_callback(request):
+        batch = json.loads(request.body)
+        body = {
+            "responses": [
+                {"id": sub["id"], "status": 200, "body": webparts[sub["url"]]}
+                for sub in batch["requests"]
+            ]
+        }
+        return (200, {}, json.dumps(body))
+
+    responses.add_callback(
+        POST,
+        "https://graph.microsoft.com/beta/$batch",
+        callback=batch_callback,
     )
 
     responses.add(
@@ -108,3 +116,33 @@ def test_pages(mock_az_default_identity, capsys):
     assert "Furry Communities" in all_stdout
     assert "<p>" not in all_stdout
     assert "Early Cryptocurrency Scams" in all_stdout
+
+    # The site id is resolved once, not once per page
+    site_calls = [
+        call for call in responses.calls if call.request.url == SAMPLE_CONFIG["api_url"]
+    ]
+    assert len(site_calls) == 1
+
+    # Both pages' webparts are fetched in a single batch
+    batch_calls = [call for call in responses.calls if call.request.method == "POST"]
+    assert len(batch_calls) == 1
+
+
+@responses.activate
+def test_site_id_kept_in_state(mock_az_default_identity):
+    responses.add(
+        GET,
+        SAMPLE_CONFIG["api_url"],
+        json=mock_site_response(),
+        status=200,
+    )
+
+    config = {**SAMPLE_CONFIG, "cache_ids_in_state": True}
+    tap1 = Tapsharepointsites(config=config)
+    site_id = tap1.streams["pages"].site_id
+
+    assert tap1.state["resolved_ids"]["sites"][SAMPLE_CONFIG["api_url"]] == site_id
+
+    tap2 = Tapsharepointsites(config=config, state=tap1.state)
+    assert tap2.streams["pages"].site_id == site_id
+    assert len(responses.calls) == 1
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from tap_sharepointsites.prefetch import prefetch
+
+
+class Recorder:
+    """Fake download that records how many downloads overlap."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started = []
+
+    def __call__(self, record):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.started.append(record["id"])
+        # later files finish first
+        time.sleep(0.01 * (5 - record["id"] % 5))
+        with self.lock:
+            self.running -= 1
+        return f"content {record['id']}"
+
+
+def test_prefetch_keeps_order():
+    records = [{"id": i, "size": 10} for i in range(10)]
+    download = Recorder()
+
+    results = list(prefetch(records, download, max_files=3))
+
+    assert results == [(record, f"content {record['id']}") for record in records]
+    assert 1 < download.max_running <= 3
+
+
+def test_prefetch_byte_limit():
+    records = [{"id": i, "size": 60} for i in range(4)]
+    download = Recorder()
+
+    for record, _ in prefetch(records, download, max_files=4, max_bytes=100):
+        # only the file being handed out fits in the budget
+        assert download.started[-1] == record["id"]
+
+    assert download.max_running == 1
+
+
+def test_prefetch_large_files_streamed():
+    records = [{"id": 0, "size": 10}, {"id": 1, "size": 1000}, {"id": 2, "size": 10}]
+
+    results = list(prefetch(records, Recorder(), max_files=2, max_bytes=100))
+
+    assert [result for _, result in results] == ["content 0", None, "content 2"]
+
+
+def test_prefetch_disabled():
+    records = [{"id": 0, "size": 10}]
+    download = Recorder()
+
+    assert list(prefetch(records, download, max_files=0)) == [(records[0], None)]
+    assert download.started == []
+
+
+def test_prefetch_discards_unused_downloads():
+    records = [{"id": i, "size": 10} for i in range(5)]
+    discarded = []
+
+    downloads = prefetch(records, Recorder(), max_files=3, discard=discarded.append)
+    assert next(downloads) == (records[0], "content 0")
+    downloads.close()
+
+    # the downloads queued behind the first file are handed back
+    assert discarded == ["content 1", "content 2"]
@@ -0,0 +1,73 @@
+import os
+
+from tap_sharepointsites.run_cache import RunCache
+
+
+def test_listing_loaded_once():
+    cache = RunCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return iter([{"id": "1"}])
+
+    key = RunCache.listing_key("drive", "/folder/", False, {"$select": "id"})
+    same_key = RunCache.listing_key("drive", "folder", False, {"$select": "id"})
+    assert cache.listing(key, load) == [{"id": "1"}]
+    assert cache.listing(same_key, load) == [{"id": "1"}]
+    assert len(calls) == 1
+    cache.close()
+
+
+def test_contents_spilled_to_disk(tmp_path):
+    cache = RunCache(max_bytes=10, spill_dir=tmp_path)
+    records = [{"id": str(i), "cTag": "c1"} for i in range(3)]
+
+    for record in records:
+        assert cache.content(record, lambda: (b"12345", "utf-8")) == (b"12345", "utf-8")
+
+    # the oldest file went to disk
+    assert cache.memory_bytes == 10
+    assert len(os.listdir(cache.spill_dir)) == 1
+    assert cache.content(records[0], lambda: (b"changed", None)) == (b"12345", "utf-8")
+
+    # a new cTag is a new version of the file
+    assert cache.content({"id": "0", "cTag": "c2"}, lambda: (b"changed", None)) == (
+        b"changed",
+        None,
+    )
+
+    cache.close()
+    assert not os.path.exists(cache.spill_dir)
+
+
+def test_contents_without_tag_not_cached():
+    cache = RunCache()
+    record = {"id": "1", "name": "a.csv"}
+
+    cache.content(record, lambda: (b"a", None))
+    assert cache.content(record, lambda: (b"b", None)) == (b"b", None)
+    cache.close()
+
+
+def test_downloaded_files_kept_on_disk(tmp_path):
+    cache = RunCache(spill_dir=tmp_path)
+    record = {"id": "1", "cTag": "c1", "name": "a.csv"}
+    downloaded = tmp_path / "download.csv"
+    downloaded.write_bytes(b"a,b\n")
+
+    assert cache.file(record, lambda: (str(downloaded), "utf-8")) == (
+        str(downloaded),
+        "utf-8",
+    )
+    os.remove(downloaded)
+
+    # later callers get their own copy, from disk or from memory
+    path, charset = cache.file(record, lambda: (None, None))
+    assert path.endswith(".csv") and charset == "utf-8"
+    with open(path, "rb") as file:
+        assert file.read() == b"a,b\n"
+    os.remove(path)
+    assert cache.content(record, lambda: (b"other", None)) == (b"a,b\n", "utf-8")
+
+    cache.close()
@@ -0,0 +1,58 @@
+from unittest import mock
+
+import requests
+
+from tap_sharepointsites.session import PooledHTTPAdapter, build_session, cache_json
+from tap_sharepointsites.tap import Tapsharepointsites
+
+SAMPLE_CONFIG = {
+    "api_url": "https://graph.microsoft.com/v1.0/sites/example.sharepoint.com:/sites/demo:/",  # noqa
+    "lists": ["list1", "list2"],
+    "http_pool_size": 4,
+    "http_connect_timeout": 3,
+    "http_read_timeout": 30,
+}
+
+
+def test_streams_share_session():
+    tap1 = Tapsharepointsites(config=SAMPLE_CONFIG)
+    session1 = tap1.streams["list1"].requests_session
+    session2 = tap1.streams["list2"].requests_session
+
+    assert session1 is session2
+    assert session1 is tap1.http_session
+
+
+def test_adapter_config():
+    session = build_session(SAMPLE_CONFIG)
+    adapter = session.get_adapter("https://graph.microsoft.com")
+
+    assert isinstance(adapter, PooledHTTPAdapter)
+    assert adapter._pool_maxsize == 4
+    assert adapter.timeout == (3, 30)
+
+
+def test_adapter_default_timeout():
+    adapter = PooledHTTPAdapter(timeout=(1, 2))
+    with mock.patch("requests.adapters.HTTPAdapter.send") as mock_send:
+        adapter.send(mock.Mock())
+        assert mock_send.call_args.kwargs["timeout"] == (1, 2)
+
+        adapter.send(mock.Mock(), timeout=5)
+        assert mock_send.call_args.kwargs["timeout"] == 5
+
+
+def test_keep_alive_disabled():
+    session = build_session({**SAMPLE_CONFIG, "http_keep_alive": False})
+    assert session.headers["Connection"] == "close"
+
+
+def test_json_decoded_once():
+    response = requests.Response()
+    response._content = b'{"value": [1, 2, 3], "@odata.nextLink": "next"}'
+    response.status_code = 200
+    cache_json(response)
+
+    first = response.json()
+    assert first["value"] == [1, 2, 3]
+    assert response.json() is first
@@ -116,3 +116,35 @@ def test_text(mock_az_default_identity, capsys):
     assert len(schema) == 1
     assert len(records) == 2
     assert "Langstrømpe" in records[0]["record"]["content"]
+
+
+@responses.activate
+def test_recursive_text(mock_az_default_identity, capsys):
+    responses.add_callback(
+        GET,
+        re.compile(r"https://m365x214355\.sharepoint\.com/.*download\.aspx\?UniqueId=.*"),
+        callback=request_callback,
+    )
+    responses.add(GET, f"{SAMPLE_CONFIG['api_url']}drive", json=drive_id_response())
+    drive_url = "https://graph.microsoft.com/v1.0/drives/b!ABCDEFGH1234567890"
+    responses.add(
+        GET,
+        f"{drive_url}/root:/sample_folder:/children",
+        json={"value": [{"id": "sub-id", "name": "sub", "folder": {}}]},
+    )
+    responses.add(GET, f"{drive_url}/items/sub-id/children", json=list_files_response())
+
+    text_config = {
+        **SAMPLE_CONFIG["text_files"][0],
+        "file_pattern": "sub/sample.*",
+        "recursive": True,
+    }
+    tap = Tapsharepointsites(config={**SAMPLE_CONFIG, "text_files": [text_config]})
+    tap.streams["file1"].sync(None)
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [message["record"] for message in messages if message["type"] == "RECORD"]
+    assert sorted(record["_sdc_source_file"] for record in records) == [
+        "sub/sample.csv",
+        "sub/sample_excel.xlsx",
+    ]
@@ -0,0 +1,108 @@
+import threading
+from unittest import mock
+
+import pytest
+import responses
+from responses import GET
+
+from tap_sharepointsites.session import build_session, throttle_stats
+from tap_sharepointsites.throttling import Throttle, parse_retry_after
+
+URL = "https://graph.microsoft.com/v1.0/sites/root"
+
+
+@pytest.fixture
+def no_sleep():
+    """Replace the throttle's clock with one that sleeping advances."""
+    clock = [1000.0]
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    with mock.patch(
+        "tap_sharepointsites.throttling.time.monotonic", side_effect=lambda: clock[0]
+    ), mock.patch(
+        "tap_sharepointsites.throttling.time.sleep", side_effect=sleep
+    ) as mock_sleep:
+        yield mock_sleep
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+
+
+@responses.activate
+def test_retry_after_is_honored(no_sleep):
+    responses.add(GET, URL, status=429, headers={"Retry-After": "7"})
+    responses.add(GET, URL, json={"id": "site"})
+
+    session = build_session({})
+    response = session.get(URL)
+
+    assert response.json() == {"id": "site"}
+    assert len(responses.calls) == 2
+    assert no_sleep.call_args_list[0].args[0] == pytest.approx(7, abs=0.1)
+
+    stats = throttle_stats(session)
+    assert stats["retries"] == 1
+    assert stats["throttled_responses"] == 1
+    assert stats["throttled_seconds"] == pytest.approx(7, abs=0.1)
+
+
+@responses.activate
+def test_gives_up_after_max_retries(no_sleep):
+    responses.add(GET, URL, status=503)
+
+    session = build_session({"max_retries": 2})
+    response = session.get(URL)
+
+    assert response.status_code == 503
+    assert len(responses.calls) == 3
+    # Jittered backoff stays within the exponential ceiling
+    assert all(0 <= call.args[0] <= 2 for call in no_sleep.call_args_list)
+
+
+@responses.activate
+def test_client_errors_are_not_retried(no_sleep):
+    responses.add(GET, URL, status=404)
+
+    response = build_session({}).get(URL)
+
+    assert response.status_code == 404
+    assert len(responses.calls) == 1
+    no_sleep.assert_not_called()
+
+
+def test_token_bucket(no_sleep):
+    throttle = Throttle(rate=10, burst=2)
+    throttle.acquire()
+    throttle.acquire()
+    no_sleep.assert_not_called()
+
+    throttle.acquire()
+    assert no_sleep.call_count >= 1
+    assert throttle.stats["rate_limited_seconds"] > 0
+
+
+def test_pause_counted_once_across_threads():
+    throttle = Throttle()
+    throttle.record_retry(
+        mock.Mock(status_code=429, headers={"Retry-After": "0.2"}), 0.2
+    )
+    barrier = threading.Barrier(4)
+
+    def acquire():
+        barrier.wait()
+        throttle.acquire()
+
+    threads = [threading.Thread(target=acquire) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert throttle.stats["throttled_responses"] == 1
+    assert throttle.stats["throttled_seconds"] == pytest.approx(0.2, abs=0.05)
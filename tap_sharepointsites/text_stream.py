@@ -5,12 +5,21 @@ import os
 import re
 import tempfile
 import typing as t
+from functools import cached_property
+from urllib.parse import parse_qsl, urlparse
 
 import requests
 import textract
 from singer_sdk import typing as th
+from singer_sdk.exceptions import FatalAPIError
 
 from tap_sharepointsites.client import sharepointsitesStream
+from tap_sharepointsites.drive_walker import (
+    DriveWalker,
+    list_folder,
+    listing_params,
+    source_name,
+)
 
 
 class TextStream(sharepointsitesStream):
@@ -36,6 +45,11 @@ class TextStream(sharepointsitesStream):
 
         return url
 
+    @property
+    def page_size(self):
+        """Return the `$top` page size, preferring the stream config."""
+        return self.text_config.get("page_size") or super().page_size
+
     @property
     def header(self):
         """Run header function."""
@@ -47,7 +61,10 @@ class TextStream(sharepointsitesStream):
         drive_id = self.get_drive_id()
         folder = self.text_config.get("folder")
 
-        if not folder:
+        if self.delta_sync:
+            # SharePoint only supports delta on the drive root
+            base_url = f"/drives/{drive_id}/root/delta"
+        elif not folder:
             base_url = f"/drives/{drive_id}/root/children"
         else:
             base_url = f"/drives/{drive_id}/root:/{folder}:/children"
@@ -55,63 +72,121 @@ class TextStream(sharepointsitesStream):
         return base_url
 
     def list_all_files(self, headers=None):
-        """List all files in the drive."""
-        drive_id = self.get_drive_id()
-        folder = self.text_config.get("folder")
+        """List all files in the folder, and its subfolders when recursive."""
+        return list_folder(
+            self,
+            self.get_drive_id(),
+            self.text_config.get("folder"),
+            headers=headers,
+            recursive=self.text_config.get("recursive", False),
+            params=self.get_listing_params(),
+        )
 
-        if not folder:
-            base_url = (
-                f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root/children"
-            )
+    def get_listing_params(self, since=None):
+        """Return the params of a folder listing, filtered server side if configured."""
+        # subfolders must be listed whatever their name or modified time
+        server_filter = self.text_config.get("server_filter", False) and not self.text_config.get(
+            "recursive", False
+        )
+        return listing_params(self.text_config["file_pattern"], since, server_filter)
+
+    @property
+    def delta_sync(self) -> bool:
+        """Whether to find changed files through the drive delta query."""
+        return bool(self.text_config.get("delta_sync"))
+
+    @cached_property
+    def walker(self):
+        """Return the walker of the delta feed, keeping its folders in state."""
+        return DriveWalker(
+            self.stream_state.setdefault("folders", {}),
+            self.text_config.get("folder"),
+            self.text_config.get("recursive", False),
+        )
+
+    def get_url_params(
+        self, context: t.Optional[dict], next_page_token: t.Optional[t.Any]
+    ) -> t.Dict[str, t.Any]:
+        """Project and filter the first request, or resume from the stored delta link."""
+        if next_page_token:
+            return super().get_url_params(context, next_page_token)
+
+        if self.delta_sync:
+            # the delta query supports $select but not $filter
+            params = listing_params(self.text_config["file_pattern"])
+            delta_link = self.stream_state.get("delta_link")
+            if delta_link:
+                params.update(parse_qsl(urlparse(delta_link).query))
         else:
-            base_url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root:/{folder}:/children"
+            params = self.get_listing_params(self.get_starting_timestamp(context))
+        return self.page_sizer.apply(params)
+
+    def validate_response(self, response: requests.Response) -> None:
+        """Explain how to recover when the stored delta link has expired."""
+        if self.delta_sync and response.status_code == 410:
+            raise FatalAPIError(
+                f"Delta link for stream {self.name} has expired. "
+                "Remove its bookmark from state to run a full resync."
+            )
+        super().validate_response(response)
 
-        while base_url:
-            response = requests.get(base_url, headers=headers, auth=self.authenticator)
-            response.raise_for_status()
-            data = response.json()
-            for item in data["value"]:
-                if "file" in item:
-                    yield item
+    def request_records(self, context: t.Optional[dict]) -> t.Iterable[dict]:
+        """Page through the folder, or walk it and its subfolders when recursive."""
+        if self.delta_sync or not self.text_config.get("recursive", False):
+            yield from super().request_records(context)
+            return
 
-            base_url = data.get("@odata.nextLink")
+        yield from self.parse_items(self.list_all_files(headers=self.header))
 
     def parse_response(self, response: requests.Response) -> t.Iterable[dict]:
         """Parse the response and return an iterator of result records."""
-        resp_values = response.json()["value"]
-        files_since = (
-            self.get_starting_replication_key_value(self.context) or datetime.fromisoformat("1900-01-01T00:00:00Z")
-        )
-
-        for record in resp_values:
-            if (
-                "file" in record.keys()
-                and re.match(self.text_config["file_pattern"], record["name"])
-                and datetime.fromisoformat(record["lastModifiedDateTime"]) > files_since
-            ):
+        data = response.json()
+        resp_values = data["value"]
+        last_page = "@odata.deltaLink" in data
+        if self.delta_sync:
+            resp_values = list(self.walker.changed_files(resp_values, last_page))
 
-                file = self.get_file_for_row(record, text=False)
+        yield from self.parse_items(resp_values)
 
-                with tempfile.NamedTemporaryFile(suffix=record["name"], delete=False) as tmpfile:
-                    tmpfile.write(file)
-                    tmpfile.flush()
-                    tmpfile.seek(0)
-                    text = textract.process(tmpfile.name)
+        # Only reached once every file of the final page has been emitted
+        if self.delta_sync and last_page:
+            self.stream_state["delta_link"] = data["@odata.deltaLink"]
 
-                row = {
-                    "content": text.decode("utf-8"),
-                    "metadata": {"source": record["name"]},
-                    "_sdc_source_file": record["name"],
-                    "_sdc_loaded_at": str(datetime.now(timezone.utc)),
-                    "lastModifiedDateTime": record["lastModifiedDateTime"],
-                }
-
-                try:
-                    os.remove(tmpfile.name)
-                except Exception as e:
-                    print(f"Error cleaning up temporary file: {e}")
+    def parse_items(self, items):
+        """Extract the text of the matching files among drive items into records."""
+        files_since = (
+            self.get_starting_replication_key_value(self.context) or datetime.fromisoformat("1900-01-01T00:00:00Z")
+        )
 
-                yield row
+        records = [
+            record
+            for record in items
+            if "file" in record.keys()
+            and re.match(self.text_config["file_pattern"], source_name(record))
+            and datetime.fromisoformat(record["lastModifiedDateTime"]) > files_since
+        ]
+
+        for record, file in self.download_files(records):
+            with tempfile.NamedTemporaryFile(suffix=record["name"], delete=False) as tmpfile:
+                tmpfile.write(file)
+                tmpfile.flush()
+                tmpfile.seek(0)
+                text = textract.process(tmpfile.name)
+
+            row = {
+                "content": text.decode("utf-8"),
+                "metadata": {"source": source_name(record)},
+                "_sdc_source_file": source_name(record),
+                "_sdc_loaded_at": str(datetime.now(timezone.utc)),
+                "lastModifiedDateTime": record["lastModifiedDateTime"],
+            }
+
+            try:
+                os.remove(tmpfile.name)
+            except Exception as e:
+                print(f"Error cleaning up temporary file: {e}")
+
+            yield row
 
     schema = th.PropertiesList(
         th.Property(
@@ -146,15 +221,25 @@ class TextStream(sharepointsitesStream):
 
     def get_drive_id(self):
         """Get drives in the sharepoint site."""
-        drive = requests.get(f'{self.config["api_url"]}drive', headers=self.header, auth=self.authenticator)
-
-        if not drive.ok:
-            raise Exception(f"Error getting drive: {drive.status_code}: {drive.text}")
-        return drive.json()["id"]
+        return self._tap.id_resolver.drive_id(self)
+
+    def download_files(self, records):
+        """Yield (record, file bytes) pairs, downloading concurrently when async."""
+        if not self.async_client:
+            for record in records:
+                yield record, self.get_file_for_row(record, text=False)
+            return
+
+        # download a window at a time so memory stays bounded
+        window = self.async_client.max_concurrency
+        for start in range(0, len(records), window):
+            batch = records[start:start + window]
+            urls = [record["@microsoft.graph.downloadUrl"] for record in batch]
+            yield from zip(batch, self.async_client.download_many(urls))
 
     def get_file_for_row(self, row_data, text=True):
         """Get the file for a row."""
-        file = requests.get(
+        file = self.requests_session.get(
             row_data["@microsoft.graph.downloadUrl"], headers=self.header, auth=self.authenticator
         )
         file.raise_for_status()
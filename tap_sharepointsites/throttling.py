@@ -0,0 +1,158 @@
+"""Tap-wide rate limiting and retry policy for Graph requests."""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+LOGGER = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value):
+    """Return the seconds to wait from a `Retry-After` header value."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class Throttle:
+    """Token bucket and retry policy shared by every request of a tap.
+
+    Requests take a token from the bucket before they are sent. Throttled
+    responses carrying `Retry-After` pause the whole tap for exactly that
+    long; other transient failures back off exponentially with full jitter.
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        burst=None,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=60.0,
+    ):
+        """Initialize the throttle.
+
+        Args:
+            rate: Requests per second allowed across the tap, or None for no limit.
+            burst: Bucket size, defaults to one second worth of requests.
+            max_retries: Retries of a single request before giving up.
+            backoff_base: First backoff interval in seconds.
+            backoff_max: Upper bound of a backoff interval in seconds.
+        """
+        self.rate = rate
+        self.burst = burst or max(rate or 1, 1)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "throttled_responses": 0,
+            "retries": 0,
+            "throttled_seconds": 0.0,
+            "rate_limited_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a throttle from the tap config."""
+        return cls(
+            rate=config.get("max_requests_per_second"),
+            max_retries=config.get("max_retries", 5),
+        )
+
+    def reserve(self):
+        """Take a token if a request may be sent now, else return seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if wait > 0:
+                return wait
+            if not self.rate:
+                return 0.0
+
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            wait = (1 - self._tokens) / self.rate
+            self.stats["rate_limited_seconds"] += wait
+            return wait
+
+    def acquire(self):
+        """Block until the bucket and any Retry-After pause allow a request."""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def retry_delay(self, response, attempt):
+        """Return the seconds to wait before retrying, or None to give up.
+
+        Args:
+            response: The failed response, or None after a connection error.
+            attempt: Number of retries already made for this request.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            return None
+
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+
+        ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def record_retry(self, response, delay):
+        """Account for a retry and return how long the caller itself must sleep.
+
+        A `Retry-After` delay pauses every request of the tap instead, and is
+        then waited out in `reserve`/`acquire` before the retry is sent.
+        """
+        with self._lock:
+            self.stats["retries"] += 1
+            if response is not None and response.status_code in (429, 503):
+                self.stats["throttled_responses"] += 1
+            if response is not None and "Retry-After" in response.headers:
+                now = time.monotonic()
+                paused_until = max(self._paused_until, now + delay)
+                # only what extends the pause is counted, however many
+                # requests then wait it out
+                self.stats["throttled_seconds"] += paused_until - max(
+                    self._paused_until, now
+                )
+                self._paused_until = paused_until
+                return 0.0
+            self.stats["throttled_seconds"] += delay
+            return delay
+
+    def wait(self, response, delay):
+        """Wait before a retry, pausing every request when asked by the server."""
+        own_delay = self.record_retry(response, delay)
+        if own_delay:
+            time.sleep(own_delay)
@@ -0,0 +1,120 @@
+"""Graph access token cache with optional encrypted disk persistence."""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from azure.core.credentials import AccessToken
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # pragma: no cover
+    Fernet = None
+
+LOGGER = logging.getLogger(__name__)
+
+# tokens this close to expiry are not handed out again
+MIN_LIFETIME_SECONDS = 300
+
+
+class TokenCache:
+    """Keep access tokens per scope and identity, optionally on disk.
+
+    The identity is the client id, credential type and tenant, so configs
+    logging in differently never share a token.
+
+    Tokens are always cached in memory. With a `path`, they are also written
+    to disk encrypted with `key` (a Fernet key), so short scheduled runs can
+    reuse a token from a previous run instead of logging in again.
+    """
+
+    def __init__(self, path=None, key=None):
+        """Initialize the cache.
+
+        Args:
+            path: File to persist tokens to, or None to keep them in memory.
+            key: Fernet key used to encrypt the file, required with `path`.
+        """
+        if path and not key:
+            raise Exception("token_cache_key is required to persist tokens to disk")
+        if path and Fernet is None:
+            raise Exception(
+                "Persisting tokens needs cryptography, install it with "
+                "`pip install tap-sharepointsites[token-cache]`"
+            )
+
+        self.path = path
+        self._fernet = Fernet(key) if path else None
+        self._lock = threading.Lock()
+        self._tokens = self._load() if path else {}
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a token cache from the tap config."""
+        return cls(config.get("token_cache_path"), config.get("token_cache_key"))
+
+    @staticmethod
+    def cache_key(scope, client_id, credential_type=None, tenant_id=None):
+        """Return the cache key of a scope and identity."""
+        return "|".join(
+            [scope, client_id or "", credential_type or "", tenant_id or ""]
+        )
+
+    def _load(self):
+        """Read and decrypt the cache file, ignoring a missing or stale file."""
+        try:
+            with open(self.path, "rb") as file:
+                return json.loads(self._fernet.decrypt(file.read()))
+        except FileNotFoundError:
+            return {}
+        except (InvalidToken, ValueError) as ex:
+            LOGGER.warning(f"Ignoring unreadable token cache {self.path}: {ex}")
+            return {}
+
+    def _save(self):
+        """Encrypt and write the cache file, readable by the owner only."""
+        data = self._fernet.encrypt(json.dumps(self._tokens).encode("utf-8"))
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, self.path)
+
+    def get(
+        self,
+        scope,
+        client_id=None,
+        min_lifetime=MIN_LIFETIME_SECONDS,
+        credential_type=None,
+        tenant_id=None,
+    ):
+        """Return a cached token valid for at least `min_lifetime` seconds, or None."""
+        key = self.cache_key(scope, client_id, credential_type, tenant_id)
+        with self._lock:
+            cached = self._tokens.get(key)
+        if not cached or cached["expires_on"] - min_lifetime <= time.time():
+            return None
+        return AccessToken(cached["token"], int(cached["expires_on"]))
+
+    def put(self, scope, client_id, token, credential_type=None, tenant_id=None):
+        """Cache a token, persisting the cache when a path is configured."""
+        with self._lock:
+            now = time.time()
+            self._tokens = {
+                key: value
+                for key, value in self._tokens.items()
+                if value["expires_on"] > now
+            }
+            self._tokens[
+                self.cache_key(scope, client_id, credential_type, tenant_id)
+            ] = {
+                "token": token.token,
+                "expires_on": token.expires_on,
+            }
+            if self.path:
+                try:
+                    self._save()
+                except OSError as ex:
+                    LOGGER.warning(f"Could not write token cache {self.path}: {ex}")